@@ -0,0 +1,94 @@
+"""
+Vues en lecture seule avec accès par attribut (dot notation) sur les dicts
+et listes d'origine, sans aucune copie.
+
+Remplace `deep_dotdict`, qui reconstruisait récursivement tout le contexte
+utilisateur (chat_history, pianos, known_brands…) à chaque évaluation :
+ici une valeur n'est enveloppée qu'au moment où elle est lue.
+"""
+from typing import Any, Iterator, Mapping, Sequence
+
+
+def wrap(value: Any) -> Any:
+    if isinstance(value, Mapping) and not isinstance(value, AttrView):
+        return AttrView(value)
+    if isinstance(value, list):
+        return ListView(value)
+    return value
+
+
+def unwrap(value: Any) -> Any:
+    if isinstance(value, (AttrView, ListView)):
+        return value._data
+    return value
+
+
+class AttrView(Mapping):
+    """
+    `view.key` ≡ `view.get("key")` (None si absente), comme l'ancien DotDict.
+    Les méthodes de Mapping (get, keys, items, values) restent prioritaires.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Mapping[str, Any]):
+        self._data = data
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return wrap(self._data.get(name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name != "_data":
+            raise AttributeError("AttrView is read-only")
+        object.__setattr__(self, name, value)
+
+    def __getitem__(self, key: str) -> Any:
+        return wrap(self._data[key])
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other: object) -> bool:
+        return unwrap(other) == self._data
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"AttrView({self._data!r})"
+
+
+class ListView(Sequence):
+    __slots__ = ("_data",)
+
+    def __init__(self, data: list):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ListView(self._data[index])
+        return wrap(self._data[index])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[Any]:
+        for value in self._data:
+            yield wrap(value)
+
+    def __contains__(self, value: object) -> bool:
+        return unwrap(value) in self._data
+
+    def __eq__(self, other: object) -> bool:
+        return unwrap(other) == self._data
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"ListView({self._data!r})"
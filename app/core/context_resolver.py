@@ -2,7 +2,7 @@ from typing import Optional
 
 from pytune_auth_common.models.schema import UserOut
 from pytune_data.models import UserContext
-from pytune_data.user_data_service import get_user_context
+from app.core.user_context_cache import get_cached_user_context
 from simple_logger.logger import get_logger
 
 logger = get_logger("ai_router")
@@ -11,7 +11,7 @@ async def resolve_user_context(user: UserOut, extra: Optional[dict] = None) -> d
     """
     Construit un dictionnaire de contexte utilisateur riche à partir :
     - de l'objet UserOut
-    - de UserContext (chargé depuis la DB)
+    - de UserContext (chargé depuis la DB, mis en cache quelques secondes)
     - d’un dictionnaire extra fourni à la volée par le client
     """
 
@@ -28,7 +28,8 @@ async def resolve_user_context(user: UserOut, extra: Optional[dict] = None) -> d
         }
 
         # 2. Ajout du contexte enrichi de la base
-        user_context_obj: UserContext = await get_user_context(user.id) # type: ignore
+        # ⚠️ l'objet est partagé (cache) : model_dump() donne une copie propre à la requête
+        user_context_obj: UserContext = await get_cached_user_context(user.id) # type: ignore
         base_ctx = user_context_obj.model_dump()
         full_context.update(base_ctx)
 
@@ -0,0 +1,113 @@
+"""
+Catalogues i18n par agent : chargés une fois, rechargés si le fichier change.
+
+Fallback :
+  - langue régionale → langue de base → `en` (ex: fr-CA → fr → en)
+  - clé absente du catalogue de la langue → clé du catalogue `en`
+"""
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+
+from app.core.paths import POLICY_DIR
+
+DEFAULT_LANG = "en"
+
+# ⏱️ Intervalle minimal entre deux vérifications mtime d'un même catalogue
+CATALOG_CHECK_INTERVAL = float(os.getenv("I18N_CHECK_INTERVAL_SECONDS", "2"))
+
+
+def _i18n_dir(agent_name: str) -> Path:
+    return POLICY_DIR / agent_name / "i18n"
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _read(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class CatalogStore:
+    def __init__(self, check_interval: float = CATALOG_CHECK_INTERVAL):
+        self._check_interval = check_interval
+        # (agent, lang) → (signature, catalogue fusionné, dernier check)
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple[int, int], Mapping[str, str], float]] = {}
+        self._langs: Dict[Tuple[str, str], str] = {}
+        self._lock = Lock()
+
+    def resolve_lang(self, agent_name: str, lang: str) -> str:
+        """Langue effectivement servie (celle dont le fichier existe)."""
+        requested = (agent_name, lang)
+        if requested in self._langs:
+            return self._langs[requested]
+
+        resolved = DEFAULT_LANG
+        normalized = (lang or DEFAULT_LANG).replace("_", "-")
+        directory = _i18n_dir(agent_name)
+        for candidate in (normalized, normalized.split("-")[0].lower()):
+            if (directory / f"{candidate}.json").exists():
+                resolved = candidate
+                break
+
+        # Borne défensive : `lang` vient du client, l'agent doit exister
+        if directory.parent.exists():
+            if len(self._langs) > 512:
+                self._langs.clear()
+            self._langs[requested] = resolved
+        return resolved
+
+    def signature(self, agent_name: str, lang: str) -> Tuple[int, int]:
+        directory = _i18n_dir(agent_name)
+        return (
+            _mtime_ns(directory / f"{lang}.json"),
+            _mtime_ns(directory / f"{DEFAULT_LANG}.json"),
+        )
+
+    def get(self, agent_name: str, lang: str) -> Mapping[str, str]:
+        lang = self.resolve_lang(agent_name, lang)
+        key = (agent_name, lang)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry and now - entry[2] < self._check_interval:
+            return entry[1]
+
+        signature = self.signature(agent_name, lang)
+        if entry and entry[0] == signature:
+            self._entries[key] = (signature, entry[1], now)
+            return entry[1]
+
+        with self._lock:
+            directory = _i18n_dir(agent_name)
+            catalog = _read(directory / f"{DEFAULT_LANG}.json")
+            if lang != DEFAULT_LANG:
+                catalog = {**catalog, **_read(directory / f"{lang}.json")}
+            merged = MappingProxyType(catalog)
+            self._entries[key] = (signature, merged, now)
+            return merged
+
+    def languages(self, agent_name: str) -> List[str]:
+        directory = _i18n_dir(agent_name)
+        langs = sorted(p.stem for p in directory.glob("*.json")) if directory.exists() else []
+        return langs or [DEFAULT_LANG]
+
+    def clear(self, agent_name: str | None = None) -> None:
+        with self._lock:
+            for cache in (self._entries, self._langs):
+                for key in [k for k in cache if agent_name is None or k[0] == agent_name]:
+                    del cache[key]
+
+
+catalog_store = CatalogStore()
@@ -0,0 +1,115 @@
+"""
+Moteur i18n en une passe.
+
+Chaque chaîne contenant `$t('key')` est découpée UNE fois en segments
+(littéraux / clés) ; le rendu pour une langue se résume à joindre des
+morceaux précalculés. Les clés manquantes sont comptées (exportées via
+/ai/metrics/i18n) au lieu d'être accumulées dans un set.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, List, Mapping, Tuple
+
+from simple_logger import get_logger, SimpleLogger
+
+logger: SimpleLogger = get_logger()
+
+_T_PATTERN = re.compile(r"""\$t\(['"]([^'"]+)['"]\)""")
+
+# Nombre maximal de triplets (agent, lang, key) suivis individuellement
+MAX_TRACKED_MISSING_KEYS = 1000
+_OVERFLOW_KEY = ("*", "*", "*")
+
+
+class MissingKeyMetrics:
+    def __init__(self, max_tracked: int = MAX_TRACKED_MISSING_KEYS):
+        self._counts: Counter = Counter()
+        self._max_tracked = max_tracked
+        self._lock = Lock()
+
+    def record(self, agent_name: str, lang: str, key: str) -> None:
+        fingerprint = (agent_name, lang, key)
+        with self._lock:
+            if fingerprint not in self._counts and len(self._counts) >= self._max_tracked:
+                fingerprint = _OVERFLOW_KEY
+            first = fingerprint not in self._counts
+            self._counts[fingerprint] += 1
+
+        # 🔔 log une seule fois par (agent, lang, key)
+        if first and fingerprint != _OVERFLOW_KEY:
+            logger.warning(f"[i18n] Missing key '{key}' (agent={agent_name}, lang={lang})")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._counts.items())
+        return [
+            {"agent": agent, "lang": lang, "key": key, "count": count}
+            for (agent, lang, key), count in sorted(items)
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+missing_keys = MissingKeyMetrics()
+
+
+@dataclass(frozen=True)
+class I18nString:
+    """Chaîne pré-découpée : (is_key, texte) par segment."""
+    parts: Tuple[Tuple[bool, str], ...]
+
+    def render(self, catalog: Mapping[str, str], agent_name: str, lang: str) -> str:
+        out = []
+        for is_key, text in self.parts:
+            if not is_key:
+                out.append(text)
+                continue
+            value = catalog.get(text)
+            if value is None:
+                missing_keys.record(agent_name, lang, text)
+                value = f"[missing:{text}]"
+            out.append(value)
+        return "".join(out)
+
+
+def tokenize(text: str):
+    """Retourne la chaîne telle quelle si elle ne contient aucun `$t(...)`."""
+    if "$t(" not in text:
+        return text
+
+    parts = []
+    last = 0
+    for match in _T_PATTERN.finditer(text):
+        if match.start() > last:
+            parts.append((False, text[last:match.start()]))
+        parts.append((True, match.group(1)))
+        last = match.end()
+    if last < len(text):
+        parts.append((False, text[last:]))
+    return I18nString(tuple(parts)) if any(is_key for is_key, _ in parts) else text
+
+
+def compile_tree(obj):
+    """Découpe toutes les chaînes d'un arbre dict / list (indépendant de la langue)."""
+    if isinstance(obj, dict):
+        return {k: compile_tree(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [compile_tree(v) for v in obj]
+    if isinstance(obj, str):
+        return tokenize(obj)
+    return obj
+
+
+def render_tree(tree, catalog: Mapping[str, str], *, agent_name: str, lang: str):
+    """Rend un arbre compilé pour un catalogue donné."""
+    if isinstance(tree, dict):
+        return {k: render_tree(v, catalog, agent_name=agent_name, lang=lang) for k, v in tree.items()}
+    if isinstance(tree, list):
+        return [render_tree(v, catalog, agent_name=agent_name, lang=lang) for v in tree]
+    if isinstance(tree, I18nString):
+        return tree.render(catalog, agent_name, lang)
+    return tree
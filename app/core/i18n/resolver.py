@@ -1,71 +1,21 @@
-import re
-import json
-from pathlib import Path
-from functools import lru_cache
+from typing import Mapping
 
-from app.core.paths import POLICY_DIR
-from simple_logger import get_logger, SimpleLogger
+from app.core.i18n.catalog import catalog_store
+from app.core.i18n.engine import compile_tree, render_tree
 
-logger: SimpleLogger = get_logger()
 
-_T_PATTERN = re.compile(r"""\$t\(['"]([^'"]+)['"]\)""")
-
-# 🔒 évite de logger 50 fois la même clé
-_MISSING_KEYS = set()
-
-
-# @lru_cache(maxsize=64)
-def _load_catalog(agent_name: str, lang: str) -> dict:
-    base = POLICY_DIR / agent_name / "i18n" / f"{lang}.json"
-    fallback = POLICY_DIR / agent_name / "i18n" / "en.json"
-
-    path = base if base.exists() else fallback
-    if not path.exists():
-        return {}
-
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+def _load_catalog(agent_name: str, lang: str) -> Mapping[str, str]:
+    return catalog_store.get(agent_name, lang)
 
 
 def resolve_i18n_deep(obj, *, agent_name: str, lang: str):
     """
     Replaces all $t('key') recursively in dict / list / str.
-    Logs missing keys once per (agent, lang, key).
-    """
-
-    catalog = _load_catalog(agent_name, lang or "en")
-
-    if isinstance(obj, dict):
-        return {
-            k: resolve_i18n_deep(v, agent_name=agent_name, lang=lang)
-            for k, v in obj.items()
-        }
+    Missing keys are counted per (agent, lang, key) and logged once.
 
-    if isinstance(obj, list):
-        return [
-            resolve_i18n_deep(v, agent_name=agent_name, lang=lang)
-            for v in obj
-        ]
-
-    if isinstance(obj, str):
-
-        def repl(match):
-            key = match.group(1)
-
-            if key in catalog:
-                return catalog[key]
-
-            # 🔔 LOG ICI (une seule fois)
-            fingerprint = (agent_name, lang, key)
-            if fingerprint not in _MISSING_KEYS:
-                _MISSING_KEYS.add(fingerprint)
-                logger.warning(
-                    f"[i18n] Missing key '{key}' "
-                    f"(agent={agent_name}, lang={lang})"
-                )
-
-            return f"[missing:{key}]"
-
-        return _T_PATTERN.sub(repl, obj)
-
-    return obj
\ No newline at end of file
+    Pour un arbre rendu dans plusieurs langues, préférer compile_tree()
+    une fois puis render_tree() par langue.
+    """
+    lang = lang or "en"
+    catalog = _load_catalog(agent_name, lang)
+    return render_tree(compile_tree(obj), catalog, agent_name=agent_name, lang=lang)
@@ -1,5 +1,8 @@
-from typing import Any, Dict
+from collections import ChainMap
+from typing import Any, Dict, Mapping, Union
 from app.models.policy_model import Policy
+from app.core.policy_scope import PolicyScope
+from app.core.attr_view import AttrView
 from pytune_data.models import UserContext
 from pydantic import ValidationError
 from pprint import pprint
@@ -7,26 +10,16 @@ from pprint import pprint
 from app.utils.piano_merge import merge_first_piano_data
 
 
-class DotDict(dict):
-    """Permet d'accéder aux clés d'un dictionnaire comme des attributs (dot notation)."""
-    __getattr__ = dict.get
-    __setattr__ = dict.__setitem__
-    __delattr__ = dict.__delitem__
-
-
-def deep_dotdict(obj):
-    if isinstance(obj, dict):
-        return DotDict({k: deep_dotdict(v) for k, v in obj.items()})
-    elif isinstance(obj, list):
-        return [deep_dotdict(v) for v in obj]
-    return obj
-
-async def evaluate_policy(policy_data: Dict[str, Any], user_context: Dict[str, Any]) -> Dict[str, Any]:
-    try:
-        policy = Policy(**policy_data)
-    except ValidationError as e:
-        print("❌ Erreur de validation du fichier policy YAML:", e)
-        raise ValueError(f"Policy YAML structure invalid: {e}")
+async def evaluate_policy(policy_data: Union[Policy, Dict[str, Any]], user_context: Dict[str, Any]) -> Dict[str, Any]:
+    # ✅ Policy déjà validée (registre) : aucun re-parsing par requête
+    if isinstance(policy_data, Policy):
+        policy = policy_data
+    else:
+        try:
+            policy = Policy(**policy_data)
+        except ValidationError as e:
+            print("❌ Erreur de validation du fichier policy YAML:", e)
+            raise ValueError(f"Policy YAML structure invalid: {e}")
 
     # ✅ Injection dynamique du snapshot de formulaire (form_context_key)
     try:
@@ -37,33 +30,28 @@ async def evaluate_policy(policy_data: Dict[str, Any], user_context: Dict[str, A
     except Exception as e:
         print(f"⚠️ Erreur lors du patch contextuel avec form_context_key: {e}")
 
-    flat_context = flatten_user_context(user_context)
-    flat_context = deep_dotdict(flat_context)
+    # 🪶 Vue dot-notation sans copie : seules les clés lues sont enveloppées
+    flat_context = AttrView(flatten_user_context(user_context))
 
-    # ✅ Variables dynamiques
-    variables = policy.context.get("variables", {})
-    for var_name, expression in variables.items():
-        try:
-            flat_context[var_name] = eval(expression, {}, flat_context)
-        except Exception as e:
-            print(f"⚠️ Erreur d'évaluation de la variable {var_name}: {e}")
+    # ✅ Variables dynamiques : évaluées à la demande, mémorisées pour le tour
+    scope = PolicyScope(policy.compiled_variables, policy.variable_dependencies, flat_context)
 
     # ✅ Évaluation du scénario
     for step in policy.conversation:
-        condition = step.if_ or step.elif_
+        condition = step.compiled_condition
         if condition:
             try:
-                match = bool(eval(condition, {}, flat_context))
-                print(f"🔎 Test de la condition '{condition}': {match}")
+                match = bool(condition.evaluate(scope))
+                print(f"🔎 Test de la condition '{condition.source}': {match}")
             except Exception as e:
-                print(f"❌ Erreur dans l'évaluation de la condition '{condition}': {e}")
+                print(f"❌ Erreur dans l'évaluation de la condition '{condition.source}': {e}")
                 match = False
             if match:
-                print(f"✅ Condition matchée: {condition}")
-                return format_response(step)
+                print(f"✅ Condition matchée: {condition.source} (variables: {scope.resolved})")
+                return format_response(step, decision=_decision(condition.source, scope))
         elif step.else_:
             print("🛜 Aucun match avant, fallback sur else.")
-            return format_response(step)
+            return format_response(step, decision=_decision("else", scope))
 
     print("⚠️ Aucune condition correspondante trouvée dans la policy.")
     return {
@@ -72,10 +60,13 @@ async def evaluate_policy(policy_data: Dict[str, Any], user_context: Dict[str, A
         "meta": {}
     }
 
-def flatten_user_context(user_context: dict) -> dict:
+def flatten_user_context(user_context: dict) -> Mapping[str, Any]:
     """
     À partir d’un contexte utilisateur riche (dict), produit une version “flat”
     directement utilisable dans eval(condition).
+
+    Seuls les groupes calculés sont construits ; le reste du contexte est lu
+    directement dans `user_context` (ChainMap, aucune copie).
     """
     flat = {}
 
@@ -110,17 +101,17 @@ def flatten_user_context(user_context: dict) -> dict:
     flat["user_language"] = user_context.get("language", "en")
     flat["user_history"] = user_context.get("history", [])
 
-    # 4. 🔁 Ajoute le reste du contexte à la racine
-    for key, value in user_context.items():
-        if key in flat and isinstance(flat[key], dict) and isinstance(value, dict):
-            flat[key].update(value)
-        elif key not in flat:
-            flat[key] = value
+    # 4. 🔁 Fusionne les groupes homonymes présents dans le contexte
+    for key, group in flat.items():
+        value = user_context.get(key)
+        if isinstance(group, dict) and isinstance(value, dict):
+            group.update(value)
 
     # 5. Définit toujours user_input
     flat["user_input"] = user_context.get("user_input", "")
 
-    return flat
+    # 6. Le reste du contexte reste accessible à la racine, sans copie
+    return ChainMap(flat, user_context)
 
 
 def eval_condition(condition: str, context: dict) -> bool:
@@ -131,9 +122,18 @@ def eval_condition(condition: str, context: dict) -> bool:
         return False
 
 
-def format_response(step) -> dict:
+def _decision(condition: str, scope: PolicyScope) -> dict:
+    """Trace de la décision : condition retenue + variables réellement évaluées."""
+    return {
+        "condition": condition,
+        "variables": list(scope.resolved),
+    }
+
+
+def format_response(step, decision: dict | None = None) -> dict:
     return {
         "message": step.say,
         "actions": [action.model_dump() for action in step.actions] if step.actions else [],
         "meta": {},
+        "decision": decision,
     }
@@ -0,0 +1,111 @@
+"""
+Expressions de policy (`context.variables`, `if` / `elif`) compilées une fois.
+
+Chaque expression est parsée, vérifiée contre une liste blanche de noeuds AST
+puis compilée en bytecode au chargement de la policy : à chaque tour,
+l'évaluation se limite à exécuter le code objet.
+"""
+import ast
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, FrozenSet, Mapping, Optional
+
+
+class PolicyExpressionError(ValueError):
+    """Expression refusée (syntaxe ou construction hors liste blanche)."""
+
+
+# 🔒 Builtins exposés aux expressions (rien d'autre n'est accessible)
+SAFE_BUILTINS = {
+    "len": len,
+    "any": any,
+    "all": all,
+    "bool": bool,
+    "int": int,
+    "float": float,
+    "str": str,
+    "min": min,
+    "max": max,
+    "abs": abs,
+    "round": round,
+    "sum": sum,
+    "sorted": sorted,
+}
+
+# Méthodes autorisées en appel (ex: `first_piano.get("brand")`, `brand.lower()`)
+SAFE_METHODS = {
+    "get", "keys", "values", "items", "count",
+    "lower", "upper", "strip", "startswith", "endswith",
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.Load,
+    ast.BoolOp, ast.And, ast.Or,
+    ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.Is, ast.IsNot, ast.In, ast.NotIn,
+    ast.IfExp, ast.Name, ast.Attribute, ast.Subscript, ast.Slice,
+    ast.Constant, ast.List, ast.Tuple, ast.Set, ast.Dict,
+    ast.Call,
+)
+
+_EVAL_GLOBALS = {"__builtins__": SAFE_BUILTINS}
+
+
+def _check_node(node: ast.AST, source: str) -> None:
+    if not isinstance(node, _ALLOWED_NODES):
+        raise PolicyExpressionError(
+            f"Construction non autorisée '{type(node).__name__}' dans: {source}"
+        )
+    if isinstance(node, ast.Name) and node.id.startswith("__"):
+        raise PolicyExpressionError(f"Nom interdit '{node.id}' dans: {source}")
+    if isinstance(node, ast.Attribute) and node.attr.startswith("_"):
+        raise PolicyExpressionError(f"Attribut interdit '{node.attr}' dans: {source}")
+    if isinstance(node, ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in SAFE_BUILTINS:
+            return
+        if isinstance(func, ast.Attribute) and func.attr in SAFE_METHODS:
+            return
+        raise PolicyExpressionError(f"Appel non autorisé dans: {source}")
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    source: str
+    code: Optional[CodeType]
+    names: FrozenSet[str]            # noms libres lus par l'expression
+    error: Optional[str] = None
+
+    @property
+    def is_valid(self) -> bool:
+        return self.code is not None
+
+    def evaluate(self, scope: Mapping[str, Any]) -> Any:
+        if self.code is None:
+            raise PolicyExpressionError(self.error)
+        return eval(self.code, _EVAL_GLOBALS, scope)
+
+
+def compile_expression(source: Any) -> CompiledExpression:
+    """
+    Parse + vérifie + compile une expression de policy.
+    Une expression invalide n'interrompt pas le chargement : elle est
+    conservée avec son erreur et échouera proprement à l'évaluation.
+    """
+    source = str(source).strip()
+    try:
+        tree = ast.parse(source, mode="eval")
+        for node in ast.walk(tree):
+            _check_node(node, source)
+        code = compile(tree, f"<policy:{source[:40]}>", "eval")
+    except (SyntaxError, PolicyExpressionError) as e:
+        print(f"⚠️ Expression de policy rejetée '{source}': {e}")
+        return CompiledExpression(source=source, code=None, names=frozenset(), error=str(e))
+
+    names = frozenset(
+        node.id for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and node.id not in SAFE_BUILTINS
+    )
+    return CompiledExpression(source=source, code=code, names=names)
@@ -1,51 +1,34 @@
+import copy
 import json
 import re
 from typing import Optional
-import yaml
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
 
 from uuid import UUID
 
 from app.core.policy_engine import evaluate_policy
 from app.models.policy_model import AgentResponse
-from app.core.paths import PROMPT_DIR, POLICY_DIR
 from app.core.prompt_builder import render_prompt_template
+from app.core.policy_registry import get_policy
+from app.core.templates import render_inline
 
 from pytune_llm.llm_connector import call_llm
-from pytune_chat.store import get_conversation_history
+from app.services.conversation_history import get_history_window
 from pytune_llm.task_reporting.reporter import TaskReporter
 
 from app.utils.templates import interpolate_yaml
-from app.core.i18n.resolver import resolve_i18n_deep
-
-
-# 🔧 Jinja2 environment (LLM prompts only)
-jinja_env = Environment(
-    loader=FileSystemLoader(PROMPT_DIR),
-    autoescape=False
-)
 
 
 # ------------------------------------------------------------
 # YAML loading + i18n resolution (ONE SINGLE PLACE)
 # ------------------------------------------------------------
 def load_yaml(agent_name: str, lang:str = 'en') -> dict:
-    path = POLICY_DIR / agent_name / "policy.yml"
-    if not path.exists():
-        raise FileNotFoundError(f"Policy file not found at: {path}")
-
-    with path.open("r", encoding="utf-8") as f:
-        policy = yaml.safe_load(f)
-
-    # ✅ ONE i18n PASS – deep, recursive
-    policy = resolve_i18n_deep(
-        policy,
-        agent_name=agent_name,
-        lang=lang,
-    )
-
-    return policy
+    """
+    Copie modifiable de la policy résolue.
+    Le parsing YAML + i18n est fait une seule fois par le registre
+    (voir app.core.policy_registry.get_policy, à préférer en lecture seule).
+    """
+    return copy.deepcopy(dict(get_policy(agent_name, lang).data))
 
 
 # ------------------------------------------------------------
@@ -62,12 +45,11 @@ async def start_policy(
     - sinon fallback sur load_policy_and_resolve
     """
     lang = context.get("user_lang") or context.get("language") or "en"
-    policy = load_yaml(agent_name, lang)
-    start_block = policy.get("start")
+    start_block = get_policy(agent_name, lang).start
 
     if start_block:
         message = interpolate_yaml(start_block.get("say", ""), context)
-        actions = start_block.get("actions", [])
+        actions = copy.deepcopy(start_block.get("actions", []))
 
         return AgentResponse(
             message=message,
@@ -84,9 +66,6 @@ async def start_policy(
 # ------------------------------------------------------------
 # MAIN RESOLUTION
 # ------------------------------------------------------------
-from jinja2 import Template
-
-
 async def load_policy_and_resolve(
     agent_name: str,
     user_context: dict,
@@ -100,18 +79,18 @@ async def load_policy_and_resolve(
     done = reporter.done if reporter else (lambda **_: None)
 
     lang = user_context.get("user_lang") or user_context.get("language") or "en"
-    policy_data = load_yaml(agent_name, lang=lang)
+    compiled = get_policy(agent_name, lang=lang)
 
     # 🔁 Inject chat history
     if chat_id and raw_input:
         try:
-            chat_history = await get_conversation_history(UUID(chat_id))
+            chat_history = await get_history_window(UUID(chat_id), limit=10)
             if chat_history:
-                user_context["chat_history"] = chat_history[-10:]
+                user_context["chat_history"] = chat_history
         except Exception as e:
             print("⚠️ Failed to load chat history:", e)
 
-    evaluated_response = await evaluate_policy(policy_data, user_context)
+    evaluated_response = await evaluate_policy(compiled.require_policy(), user_context)
 
     # --------------------------------------------------------
     # Message rendering (Jinja only – i18n already resolved)
@@ -120,7 +99,7 @@ async def load_policy_and_resolve(
 
     try:
         if message and ("{{" in message or "{%" in message):
-            message = Template(message).render(**user_context)
+            message = render_inline(message, user_context)
     except Exception as e:
         print("⚠️ Jinja2 rendering failed:", e)
 
@@ -133,7 +112,7 @@ async def load_policy_and_resolve(
         llm_response = await call_llm(
             prompt=prompt,
             context=user_context,
-            metadata=policy_data.get("metadata", {}),
+            metadata=dict(compiled.metadata),
         )
         message = message.replace("${llm_response}", llm_response)
 
@@ -147,7 +126,7 @@ async def load_policy_and_resolve(
             message = await call_llm(
                 prompt=prompt,
                 context=user_context,
-                metadata=policy_data.get("metadata", {}),
+                metadata=dict(compiled.metadata),
             )
         except FileNotFoundError:
             message = "🤖 I’m here, but no rule matched and no prompt was found."
@@ -0,0 +1,183 @@
+"""
+Registre des policies compilées.
+
+Chaque `policy.yml` est lue, résolue (i18n) et validée UNE seule fois par
+(agent, lang), puis servie depuis la mémoire tant que le fichier et ses
+catalogues i18n n'ont pas changé (invalidation par mtime) ou qu'un reload
+explicite n'a pas été demandé. `warm_policies()` précalcule toutes les
+langues au démarrage : aucune substitution `$t(...)` sur le chemin requête.
+"""
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import yaml
+from pydantic import ValidationError
+
+from app.core.paths import POLICY_DIR
+from app.core.i18n.catalog import catalog_store
+from app.core.i18n.engine import compile_tree, render_tree
+from app.models.policy_model import Policy
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """
+    Policy prête à l'emploi, partagée entre toutes les requêtes.
+    ⚠️ Lecture seule : ne jamais muter `data` ni ses sous-blocs.
+    """
+    agent_name: str
+    lang: str
+    path: Path
+    signature: Tuple[int, ...]
+    data: Mapping[str, Any]          # YAML résolu (i18n déjà appliqué)
+    policy: Optional[Policy]         # None si la structure est invalide
+    error: Optional[str] = None
+
+    @property
+    def metadata(self) -> Mapping[str, Any]:
+        return self.data.get("metadata") or {}
+
+    @property
+    def start(self) -> Optional[Mapping[str, Any]]:
+        return self.data.get("start")
+
+    def require_policy(self) -> Policy:
+        if self.policy is None:
+            raise ValueError(f"Policy YAML structure invalid: {self.error}")
+        return self.policy
+
+
+# ⏱️ Intervalle minimal entre deux vérifications mtime d'une même policy
+POLICY_CHECK_INTERVAL = float(os.getenv("POLICY_CHECK_INTERVAL_SECONDS", "2"))
+
+_CACHE: Dict[Tuple[str, str], CompiledPolicy] = {}
+# agent → (mtime du YAML, arbre tokenisé commun à toutes les langues)
+_SOURCES: Dict[str, Tuple[int, Any]] = {}
+_CHECKED_AT: Dict[Tuple[str, str], float] = {}
+_LOCK = Lock()
+
+
+def policy_path(agent_name: str) -> Path:
+    return POLICY_DIR / agent_name / "policy.yml"
+
+
+def _signature(agent_name: str, lang: str) -> Tuple[int, ...]:
+    """
+    Empreinte des fichiers dont dépend la policy résolue :
+    le YAML + les catalogues i18n (langue servie et fallback `en`).
+    """
+    return (
+        policy_path(agent_name).stat().st_mtime_ns,
+        *catalog_store.signature(agent_name, lang),
+    )
+
+
+def _source(agent_name: str, mtime_ns: int):
+    """YAML parsé + chaînes `$t(...)` tokenisées, partagé entre les langues."""
+    cached = _SOURCES.get(agent_name)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    with policy_path(agent_name).open("r", encoding="utf-8") as f:
+        tree = compile_tree(yaml.safe_load(f) or {})
+    _SOURCES[agent_name] = (mtime_ns, tree)
+    return tree
+
+
+def _compile(agent_name: str, lang: str, signature: Tuple[int, ...]) -> CompiledPolicy:
+    path = policy_path(agent_name)
+    tree = _source(agent_name, signature[0])
+
+    # ✅ ONE i18n PASS – rendu des segments précalculés
+    data = render_tree(
+        tree,
+        catalog_store.get(agent_name, lang),
+        agent_name=agent_name,
+        lang=lang,
+    )
+
+    policy, error = None, None
+    try:
+        policy = Policy(**data)
+    except ValidationError as e:
+        print(f"❌ Erreur de validation de la policy '{agent_name}':", e)
+        error = str(e)
+
+    return CompiledPolicy(
+        agent_name=agent_name,
+        lang=lang,
+        path=path,
+        signature=signature,
+        data=MappingProxyType(data),
+        policy=policy,
+        error=error,
+    )
+
+
+def get_policy(agent_name: str, lang: str = "en") -> CompiledPolicy:
+    """
+    Retourne la policy compilée pour (agent, lang).
+    Recompile uniquement si le YAML ou un catalogue i18n a été modifié.
+    """
+    lang = catalog_store.resolve_lang(agent_name, lang)
+    key = (agent_name, lang)
+    now = time.monotonic()
+
+    cached = _CACHE.get(key)
+    if cached and now - _CHECKED_AT.get(key, 0) < POLICY_CHECK_INTERVAL:
+        return cached
+
+    path = policy_path(agent_name)
+    if not path.exists():
+        raise FileNotFoundError(f"Policy file not found at: {path}")
+
+    signature = _signature(agent_name, lang)
+    if cached and cached.signature == signature:
+        _CHECKED_AT[key] = now
+        return cached
+
+    with _LOCK:
+        cached = _CACHE.get(key)
+        if not cached or cached.signature != signature:
+            cached = _compile(agent_name, lang, signature)
+            _CACHE[key] = cached
+        _CHECKED_AT[key] = now
+        return cached
+
+
+def warm_policies() -> int:
+    """
+    Précompile toutes les policies pour toutes les langues disponibles.
+    Appelé au démarrage ; retourne le nombre de (agent, lang) compilés.
+    """
+    count = 0
+    for path in sorted(POLICY_DIR.glob("*/policy.yml")):
+        agent_name = path.parent.name
+        for lang in catalog_store.languages(agent_name):
+            try:
+                get_policy(agent_name, lang)
+                count += 1
+            except Exception as e:
+                print(f"⚠️ Préchargement impossible pour {agent_name}/{lang}: {e}")
+    return count
+
+
+def reload_policies(agent_name: Optional[str] = None) -> int:
+    """
+    Invalide le cache (un agent ou tous), catalogues i18n compris.
+    Retourne le nombre d'entrées purgées.
+    """
+    with _LOCK:
+        keys = [k for k in _CACHE if agent_name is None or k[0] == agent_name]
+        for key in keys:
+            del _CACHE[key]
+            _CHECKED_AT.pop(key, None)
+        for agent in [a for a in _SOURCES if agent_name is None or a == agent_name]:
+            del _SOURCES[agent]
+    catalog_store.clear(agent_name)
+    return len(keys)
@@ -0,0 +1,94 @@
+"""
+Résolution paresseuse des `context.variables` d'une policy.
+
+Le scope est passé tel quel comme `locals` à eval() : une variable n'est
+évaluée qu'au premier accès, puis mémorisée pour le reste du tour.
+Les dépendances (calculées depuis l'AST au chargement) ne portent que sur
+les variables déclarées AVANT, ce qui conserve la sémantique historique
+de l'évaluation séquentielle (ex: `first_piano: first_piano` lit le contexte).
+"""
+from typing import Any, Dict, FrozenSet, Iterator, List, Mapping
+
+from app.core.policy_expressions import CompiledExpression
+
+
+class _VariableView(Mapping):
+    """Vue restreinte utilisée pendant l'évaluation d'une variable."""
+    __slots__ = ("_scope", "_deps")
+
+    def __init__(self, scope: "PolicyScope", deps: FrozenSet[str]):
+        self._scope = scope
+        self._deps = deps
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._deps:
+            return self._scope.lookup(name)
+        return self._scope.context[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._scope)
+
+    def __len__(self) -> int:
+        return len(self._scope)
+
+
+class PolicyScope(Mapping):
+    """
+    Mapping { variables de policy (lazy) + contexte utilisateur }.
+    `resolved` garde l'ordre des variables effectivement évaluées.
+    """
+
+    def __init__(
+        self,
+        variables: Mapping[str, CompiledExpression],
+        dependencies: Mapping[str, FrozenSet[str]],
+        context: Mapping[str, Any],
+    ):
+        self.context = context
+        self._variables = variables
+        self._dependencies = dependencies
+        self._values: Dict[str, Any] = {}
+        self._failed: set = set()
+        self.resolved: List[str] = []
+
+    def resolve(self, name: str) -> Any:
+        if name in self._values:
+            return self._values[name]
+        if name in self._failed:
+            raise KeyError(name)
+
+        expression = self._variables[name]
+        try:
+            value = expression.evaluate(_VariableView(self, self._dependencies.get(name, frozenset())))
+        except Exception as e:
+            print(f"⚠️ Erreur d'évaluation de la variable {name}: {e}")
+            self._failed.add(name)
+            raise KeyError(name) from e
+
+        self._values[name] = value
+        self.resolved.append(name)
+        return value
+
+    def lookup(self, name: str) -> Any:
+        # Variable en échec → on retombe sur le contexte (comme en mode eager)
+        if name in self._variables:
+            try:
+                return self.resolve(name)
+            except KeyError:
+                pass
+        return self.context[name]
+
+    def __getitem__(self, name: str) -> Any:
+        return self.lookup(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._variables or name in self.context
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._variables
+        for key in self.context:
+            if key not in self._variables:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
@@ -1,13 +1,16 @@
 # 👈 ← Construit le prompt à partir de la policy
+import hashlib
 from pathlib import Path
-from typing import Optional
+from threading import Lock
+from typing import Dict, Optional, Tuple
 
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+from jinja2 import TemplateNotFound
 from pytune_data.models import UserContext
 from app.core.paths import PROMPT_DIR, POLICY_DIR
+from app.core.templates import prompt_templates
 
-# 🔧 Jinja2 environment
-jinja_env = Environment(loader=FileSystemLoader(PROMPT_DIR), autoescape=False)
+# 🔧 Jinja2 environment (partagé, cf. app.core.templates)
+jinja_env = prompt_templates
 
 def build_prompt(user_context: UserContext, page: str, user_message: Optional[str] = None) -> str:
     """
@@ -56,16 +59,41 @@ def render_prompt_template(agent_name: str, context: dict) -> str:
         print(f"⚠️ Jinja2 rendering error for '{agent_name}':", str(e))
         raise
 
+# 📦 Sources brutes : chemin → (mtime, contenu)
+_SOURCE_CACHE: Dict[Path, Tuple[int, str]] = {}
+_SOURCE_LOCK = Lock()
+
+
 def load_prompt_template_source(template_name: str) -> str:
     """
     Charge le contenu brut d’un template Jinja (.j2) depuis PROMPT_DIR.
+    Mis en cache par (chemin, mtime) : évite la lecture disque, pas la
+    compilation, faite par le consommateur du source (run_chat_turn).
 
     Ex:
         load_prompt_template_source("prompt_piano_agent_conversation.j2")
     """
     path = Path(PROMPT_DIR) / template_name
 
-    if not path.exists():
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
         raise FileNotFoundError(f"Prompt template not found: {path}")
 
-    return path.read_text(encoding="utf-8")
\ No newline at end of file
+    cached = _SOURCE_CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    source = path.read_text(encoding="utf-8")
+    with _SOURCE_LOCK:
+        _SOURCE_CACHE[path] = (mtime, source)
+    return source
+
+
+def prompt_template_version(agent_name: str) -> str:
+    """
+    Empreinte courte du template `prompt_{agent_name}.j2` : change dès que
+    le prompt est modifié (sert de clé aux caches de résultats LLM).
+    """
+    source = load_prompt_template_source(f"prompt_{agent_name}.j2")
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
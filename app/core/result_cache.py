@@ -0,0 +1,159 @@
+"""
+Cache persistant clé → JSON (SQLite), partagé par les workers d'un même hôte.
+
+- un espace de noms par usage (photos, vision, llm…)
+- TTL par entrée, éviction LRU (date d'accès) au-delà de `max_entries`
+- accès disque hors boucle asyncio (`asyncio.to_thread`)
+
+Utilisé pour ce qui coûte cher à recalculer (appels vision / LLM, uploads)
+et doit survivre à un redémarrage ; pas pour les caches chauds en mémoire.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional
+
+RESULT_CACHE_PATH = Path(os.getenv("RESULT_CACHE_PATH", "/tmp/pytune/result_cache.sqlite3"))
+# Une éviction LRU toutes les N écritures (COUNT(*) évité sur chaque set)
+_EVICT_EVERY = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed_at);
+"""
+
+_connections: Dict[Path, sqlite3.Connection] = {}
+_connections_lock = Lock()
+_db_lock = Lock()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    with _connections_lock:
+        conn = _connections.get(path)
+        if conn is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            _connections[path] = conn
+        return conn
+
+
+def hash_key(*parts: Any) -> str:
+    """Clé stable (sha256) à partir de composants JSON-sérialisables."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        ttl: float,
+        max_entries: int = 10_000,
+        path: Path = RESULT_CACHE_PATH,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._path = path
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- accès synchrones (exécutés dans un thread) ----------
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with _db_lock:
+            conn = _connect(self._path)
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                return None
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        with _db_lock:
+            conn = _connect(self._path)
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, now + (self.ttl if ttl is None else ttl), now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        conn.execute(
+            """
+            DELETE FROM entries WHERE namespace = ? AND key IN (
+                SELECT key FROM entries WHERE namespace = ?
+                ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.namespace, self.namespace, self.max_entries),
+        )
+
+    def _delete(self, key: Optional[str]) -> None:
+        with _db_lock:
+            conn = _connect(self._path)
+            if key is None:
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+            else:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    # ---------- API async ----------
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            value = await asyncio.to_thread(self._get, key)
+        except sqlite3.Error as e:
+            print(f"⚠️ Result cache '{self.namespace}' read failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            await asyncio.to_thread(self._set, key, value, ttl)
+        except sqlite3.Error as e:
+            print(f"⚠️ Result cache '{self.namespace}' write failed: {e}")
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._delete, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"namespace": self.namespace, "hits": self.hits, "misses": self.misses}
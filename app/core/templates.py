@@ -1,7 +1,86 @@
-from jinja2 import Environment, FileSystemLoader
-from app.core.paths import EMAIL_TEMPLATES_DIR
+"""
+Service Jinja partagé (prompts LLM + emails).
 
+- un seul Environment par famille de templates
+- bytecode persistant sur disque (survit aux redémarrages / déploiements)
+- LRU des templates inline (messages de policy) indexé par hash du source
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from app.core.paths import EMAIL_TEMPLATES_DIR, PROMPT_DIR
+
+JINJA_BYTECODE_CACHE_DIR = Path(os.getenv("JINJA_BYTECODE_CACHE_DIR", "/tmp/pytune/jinja_cache"))
+INLINE_TEMPLATE_CACHE_SIZE = int(os.getenv("JINJA_INLINE_CACHE_SIZE", "256"))
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    try:
+        JINJA_BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        return FileSystemBytecodeCache(str(JINJA_BYTECODE_CACHE_DIR), "pytune_%s.cache")
+    except OSError as e:
+        print(f"⚠️ Jinja bytecode cache disabled ({JINJA_BYTECODE_CACHE_DIR}): {e}")
+        return None
+
+
+bytecode_cache = _bytecode_cache()
+
+# 🔧 Prompts LLM (pas d'échappement HTML)
+prompt_templates = Environment(
+    loader=FileSystemLoader(str(PROMPT_DIR)),
+    autoescape=False,
+    bytecode_cache=bytecode_cache,
+)
+
+# 📧 Emails HTML
 email_templates = Environment(
     loader=FileSystemLoader(str(EMAIL_TEMPLATES_DIR)),
-    autoescape=True
+    autoescape=True,
+    bytecode_cache=bytecode_cache,
 )
+
+
+_inline_cache: "OrderedDict[str, Template]" = OrderedDict()
+_inline_lock = Lock()
+
+
+def get_inline_template(source: str) -> Template:
+    """Template compilé pour un source inline, mis en cache (LRU) par hash."""
+    key = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    with _inline_lock:
+        template = _inline_cache.get(key)
+        if template is not None:
+            _inline_cache.move_to_end(key)
+            return template
+
+    template = prompt_templates.from_string(source)
+    with _inline_lock:
+        _inline_cache[key] = template
+        if len(_inline_cache) > INLINE_TEMPLATE_CACHE_SIZE:
+            _inline_cache.popitem(last=False)
+    return template
+
+
+def render_inline(source: str, context: dict) -> str:
+    return get_inline_template(source).render(**context)
+
+
+def precompile_prompt_templates() -> int:
+    """
+    Compile tous les prompts `.j2` (et alimente le cache bytecode).
+    Retourne le nombre de templates chargés.
+    """
+    count = 0
+    for name in prompt_templates.list_templates(extensions=["j2"]):
+        try:
+            prompt_templates.get_template(name)
+            count += 1
+        except Exception as e:
+            print(f"⚠️ Prompt template '{name}' failed to compile: {e}")
+    return count
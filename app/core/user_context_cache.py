@@ -0,0 +1,80 @@
+"""
+Cache court (TTL) du UserContext chargé depuis la base.
+
+/public-metadata, /start et /evaluate arrivent souvent en rafale pour un
+même utilisateur : un seul chargement DB est fait (single-flight), les
+requêtes suivantes réutilisent le résultat pendant quelques secondes.
+Toute modification des pianos / du profil / des sessions doit appeler
+`invalidate_user_context` (ou POST /ai/agents/context/invalidate hors service).
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from pytune_data.models import UserContext
+from pytune_data.user_data_service import get_user_context
+
+from app.utils.single_flight import SingleFlight
+
+USER_CONTEXT_CACHE_TTL = float(os.getenv("USER_CONTEXT_CACHE_TTL_SECONDS", "10"))
+USER_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("USER_CONTEXT_CACHE_MAX_ENTRIES", "2048"))
+
+
+class UserContextCache:
+    def __init__(self, ttl: float = USER_CONTEXT_CACHE_TTL, max_entries: int = USER_CONTEXT_CACHE_MAX_ENTRIES):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[float, UserContext]]" = OrderedDict()
+        # ⚠️ incrémenté à chaque invalidation pendant un chargement : un chargement
+        # lancé avant l'invalidation ne doit pas repeupler le cache avec des données
+        # périmées. N'existe que tant qu'un chargement est en cours (`_loading`).
+        self._generations: Dict[int, int] = {}
+        self._loading: Dict[int, int] = {}
+        self._flight = SingleFlight()
+
+    async def get(self, user_id: int) -> Optional[UserContext]:
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        generation = self._generations.get(user_id, 0)
+        return await self._flight.do((user_id, generation), lambda: self._load(user_id, generation))
+
+    async def _load(self, user_id: int, generation: int) -> Optional[UserContext]:
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        try:
+            context = await get_user_context(user_id)
+        finally:
+            self._loading[user_id] -= 1
+            stale = self._generations.get(user_id, 0) != generation
+            if not self._loading[user_id]:
+                # plus aucun chargement en vol : la génération peut être oubliée
+                del self._loading[user_id]
+                self._generations.pop(user_id, None)
+        if context is not None and not stale:
+            self._entries[user_id] = (time.monotonic() + self._ttl, context)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return context
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        if user_id is None:
+            self._entries.clear()
+            self._generations.clear()
+            return
+        self._entries.pop(user_id, None)
+        if user_id in self._loading:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+
+user_context_cache = UserContextCache()
+
+
+async def get_cached_user_context(user_id: int) -> Optional[UserContext]:
+    return await user_context_cache.get(user_id)
+
+
+def invalidate_user_context(user_id: Optional[int] = None) -> None:
+    user_context_cache.invalidate(user_id)
@@ -9,8 +9,9 @@ from app.core.context_resolver import resolve_user_context
 from app.core.context_enrichment import enrich_context
 from app.core.policy_loader import load_yaml, load_policy_and_resolve
 from pytune_chat.orchestrator import run_chat_turn
-from pytune_chat.store import append_message, create_conversation, get_conversation_history
+from pytune_chat.store import create_conversation
 from app.services.brand_resolver import resolve_brand_name
+from app.services.conversation_history import append_to_history, get_history_window
 from app.services.age_resolver import resolve_age
 from app.services.piano_extract import extract_structured_piano_data, make_readable_message_from_extraction
 from app.services.type_resolver import resolve_type
@@ -102,12 +103,16 @@ async def piano_agent_handler(
             if conversation_id_str:
                 try:
                     uuid_ = UUID(conversation_id_str)
-                    raw_history = await get_conversation_history(uuid_)
+                    raw_history = await get_history_window(uuid_)
                     chat_history = normalize_chat_history(raw_history)
                 except Exception as e:
                     print("⚠️ Could not fetch chat history:", e)
 
             enriched["chat_history"] = chat_history
+            # ⚡️ Source mise en cache par mtime (pas de lecture disque par tour).
+            # ⚠️ run_chat_turn n'accepte qu'un source : il le re-parse à chaque tour.
+            # Pas de pré-rendu ici pour l'éviter : le texte rendu (données
+            # utilisateur comprises) serait ré-interprété par Jinja.
             template_source = load_prompt_template_source(
                 "prompt_piano_agent_conversation.j2"
             )
@@ -206,9 +211,9 @@ async def piano_agent_handler(
         try:
             uuid_ = UUID(conversation_id_str)
             if user_message:
-                await append_message(uuid_, "user", user_message)
+                await append_to_history(uuid_, "user", user_message)
             if response.message:
-                await append_message(uuid_, "assistant", response.message)
+                await append_to_history(uuid_, "assistant", response.message)
         except Exception as e:
             print("⚠️ Failed to store chat history:", e)
 
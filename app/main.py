@@ -14,6 +14,7 @@ from .routers.agent_launcher_router import router as agent_launcher_router
 from .routers.agents.piano_photos import router as photos_upload_router
 from .routers.task_stream_router import router as task_stream_router
 from .routers.tts_router import router as tts_router
+from .routers.metrics_router import router as metrics_router
 from simple_logger.logger import get_logger, SimpleLogger
 from pytune_configuration.sync_config_singleton import config, SimpleConfig
 
@@ -54,23 +55,57 @@ except Exception as e:
     raise RuntimeError("Failed to set RateLimit") from e
 
 # 🌟 Lifespan
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     try:
-#         await logger.asuccess("PYTUNE AI ROUTER READY!")
-#         yield
-#     except asyncio.CancelledError:
-#         await logger.acritical("❌ Lifespan cancelled")
-#         raise
-#     finally:
-#         await logger.asuccess("✅ Lifespan finished without errors")
+from .core.policy_registry import warm_policies
+from .core.templates import precompile_prompt_templates
+from .services.message_journal import message_journal
+from .services.image_compression import compression_pool
+from .services.task_events import task_events
+from .services.tts_service import TTS_PREWARM, prewarm_catalog_sentences, tts_cache
+
+JINJA_PRECOMPILE = os.getenv("JINJA_PRECOMPILE", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prewarm_task = None
+    try:
+        # 📜 Policies résolues (YAML + i18n) précalculées pour toutes les langues
+        warmed = warm_policies()
+        logger.info(f"📜 {warmed} policies precompiled")
+
+        # 🧩 Prompts Jinja compilés (bytecode persistant sur disque)
+        if JINJA_PRECOMPILE:
+            compiled = precompile_prompt_templates()
+            logger.info(f"🧩 {compiled} prompt templates precompiled")
+
+        # 🔊 Index du cache audio TTS (taille / âge bornés)
+        indexed = await asyncio.to_thread(tts_cache.rebuild)
+        logger.info(f"🔊 {indexed} TTS audio files indexed")
+        if TTS_PREWARM:
+            # 🔥 phrases fixes des catalogues i18n, en tâche de fond
+            prewarm_task = asyncio.create_task(prewarm_catalog_sentences(), name="tts-prewarm")
+
+        # 💾 Écriture différée des messages de conversation
+        message_journal.start()
+
+        await logger.asuccess("PYTUNE AI ROUTER READY!")
+        yield
+    except asyncio.CancelledError:
+        await logger.acritical("❌ Lifespan cancelled")
+        raise
+    finally:
+        await message_journal.stop()
+        compression_pool.shutdown()
+        await task_events.close()
+        if prewarm_task is not None:
+            prewarm_task.cancel()
+        await logger.asuccess("✅ Lifespan finished without errors")
 
 # 🚀 FastAPI app
 app = FastAPI(
     title=PROJECT_TITLE,
     version=PROJECT_VERSION,
     description=PROJECT_DESCRIPTION,
-    # lifespan=lifespan,
+    lifespan=lifespan,
 )
 
 # 🔗 Middleware CORS
@@ -90,6 +125,7 @@ app.add_middleware(
         "X-Refresh-Token",
         "Cache-Control",
         "X-User-Lang",
+        "X-Task-Id",
     ],
     expose_headers=[
         "Authorization",
@@ -119,6 +155,7 @@ app.include_router(agent_launcher_router)
 app.include_router(photos_upload_router)
 app.include_router(task_stream_router)
 app.include_router(tts_router)
+app.include_router(metrics_router)
 
 
 # 📄 Gestion des erreurs FastAPI
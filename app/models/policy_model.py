@@ -1,13 +1,19 @@
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, FrozenSet, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
+
+from app.core.policy_expressions import CompiledExpression, compile_expression
 
 
 class Trigger(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     event: str
     condition: Optional[str]
 
 
 class Action(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     suggest_action: Optional[str] = None
     route_to: Optional[str] = None
     trigger_event: Optional[str] = None
@@ -19,12 +25,26 @@ class Action(BaseModel):
 
 
 class ConversationStep(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     if_: Optional[str] = Field(None, alias="if")
     elif_: Optional[str] = Field(None, alias="elif")
     else_: Optional[bool] = Field(None, alias="else")
     say: Optional[str]
     actions: List[Action] = []  # plus Optional
 
+    # ⚙️ Condition compilée une fois au chargement de la policy
+    _condition: Optional[CompiledExpression] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        condition = self.if_ or self.elif_
+        if condition:
+            self._condition = compile_expression(condition)
+
+    @property
+    def compiled_condition(self) -> Optional[CompiledExpression]:
+        return self._condition
+
     @field_validator("actions", mode="before")
     @classmethod
     def normalize_actions(cls, v):
@@ -44,6 +64,8 @@ class ConversationStep(BaseModel):
 
 
 class Metadata(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     version: str
     lang: str
     allow_interruptions: bool = True
@@ -56,6 +78,8 @@ class Metadata(BaseModel):
 
 
 class Policy(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     name: str
     description: str
     triggers: List[Trigger]
@@ -63,6 +87,31 @@ class Policy(BaseModel):
     conversation: List[ConversationStep]
     metadata: Metadata
 
+    # ⚙️ context.variables compilées (ordre de déclaration conservé)
+    _variables: Dict[str, CompiledExpression] = PrivateAttr(default_factory=dict)
+    # 🔗 Graphe de dépendances : variable → variables déclarées avant qu'elle lit
+    _dependencies: Dict[str, FrozenSet[str]] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        variables = (self.context or {}).get("variables") or {}
+        self._variables = {
+            name: compile_expression(expression)
+            for name, expression in variables.items()
+        }
+
+        declared: set = set()
+        for name, expression in self._variables.items():
+            self._dependencies[name] = frozenset(expression.names & declared)
+            declared.add(name)
+
+    @property
+    def compiled_variables(self) -> Dict[str, CompiledExpression]:
+        return self._variables
+
+    @property
+    def variable_dependencies(self) -> Dict[str, FrozenSet[str]]:
+        return self._dependencies
+
 
 class AgentResponse(BaseModel):
     message: str
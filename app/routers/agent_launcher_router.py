@@ -1,16 +1,18 @@
 import asyncio
+import os
 from typing import Any, Dict
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Request, Body
-from pytune_chat.store import get_conversation_history
-from app.core.policy_loader import load_policy_and_resolve, load_yaml, start_policy
+from app.core.policy_loader import load_policy_and_resolve, start_policy
+from app.core.policy_registry import get_policy, reload_policies
 from app.core.context_resolver import resolve_user_context
+from app.core.user_context_cache import invalidate_user_context
 from app.core.context_enrichment import enrich_context
 from pytune_auth_common.models.schema import UserOut
 from pytune_auth_common.services.auth_checks import get_current_user
 from app.models.policy_model import AgentResponse
-from pytune_chat.store import append_message
-from pytune_llm.task_reporting.reporter import TaskReporter
+from app.services.conversation_history import append_to_history, conversation_history
+from app.services.task_reporter import ScopedTaskReporter, get_task_id
 
 # ✅ Handlers spécialisés
 from app.handlers.piano_agent_handler import (
@@ -22,10 +24,19 @@ from app.utils.dontknow_utils import humanize_dont_know_list, inject_dont_know_m
 
 router = APIRouter(prefix="/ai/agents", tags=["AI Agents"])
 
+# 🔐 Types d'utilisateurs autorisés sur les routes d'administration
+ADMIN_USER_TYPES = {t.strip().lower() for t in os.getenv("ADMIN_USER_TYPES", "admin").split(",") if t.strip()}
+
+
+def require_admin(user: UserOut = Depends(get_current_user)) -> UserOut:
+    user_type = str(getattr(user.user_type, "value", user.user_type) or "").lower()
+    if user_type not in ADMIN_USER_TYPES:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return user
+
 @router.get("/{agent_name}/public-metadata")
 async def get_agent_public_metadata(agent_name: str, lang:str='en'):
-    policy = load_yaml(agent_name, lang)
-    metadata = policy.get("metadata", {}) or {}
+    metadata = get_policy(agent_name, lang).metadata
 
     # ⚠️ filtrer explicitement
     return {
@@ -39,13 +50,37 @@ async def get_agent_public_metadata(agent_name: str, lang:str='en'):
         "input": metadata.get("input"),
     }
 
+@router.post("/{agent_name}/reload")
+async def reload_agent_policy(
+    agent_name: str,
+    user: UserOut = Depends(require_admin),
+):
+    """
+    Force la relecture de la policy (YAML + i18n) au prochain appel,
+    sans attendre la détection par mtime.
+    """
+    evicted = reload_policies(agent_name)
+    return {"agent": agent_name, "evicted": evicted}
+
+@router.post("/context/invalidate")
+async def invalidate_cached_user_context(
+    user: UserOut = Depends(get_current_user),
+):
+    """
+    À appeler après une modification des pianos / du profil de l'utilisateur
+    (hors de ce service) pour ne pas attendre l'expiration du cache.
+    """
+    invalidate_user_context(user.id)
+    return {"user_id": user.id, "invalidated": True}
+
 @router.post("/{agent_name}/start", response_model=AgentResponse)
 async def start_agent(
     agent_name: str,
     extra_context: dict = Body(..., embed=True),
     user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
-    reporter = TaskReporter(agent_name, auto_progress=True)
+    reporter = ScopedTaskReporter(agent_name, user_id=user.id, task_id=task_id, auto_progress=True)
 
     # Step 1: Load policy
     await reporter.step(f"📥 Starting agent")
@@ -54,8 +89,7 @@ async def start_agent(
         or extra_context.get("language")
         or "en"
     )
-    policy = load_yaml(agent_name, lang)
-    metadata = policy.get("metadata", {}) or {}
+    metadata = get_policy(agent_name, lang).metadata
     use_memory = metadata.get("memory") is True
 
     # Step 2: Create memory if needed
@@ -64,6 +98,7 @@ async def start_agent(
         from pytune_chat.store import create_conversation
         conv = await create_conversation(user.id, topic=agent_name)
         conversation_id = str(conv.id)
+        conversation_history.track_new(conv.id)
 
     # Step 3: Resolve context
     full_context = await resolve_user_context(user, extra=extra_context)
@@ -90,9 +125,8 @@ async def start_agent(
 
     # Store first message if needed
     if conversation_id and response.message:
-        from pytune_chat.store import append_message
         try:
-            await append_message(UUID(conversation_id), "assistant", response.message)
+            await append_to_history(UUID(conversation_id), "assistant", response.message)
         except Exception as e:
             print(f"⚠️ Failed to log assistant message: {e}")
 
@@ -105,13 +139,14 @@ async def evaluate_agent(
     agent_name: str,
     request: Request,
     user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
     try:
         payload = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
     
-    reporter = TaskReporter(agent_name, auto_progress=True)
+    reporter = ScopedTaskReporter(agent_name, user_id=user.id, task_id=task_id, auto_progress=True)
     extra_context = payload.get("extra_context", {})
     conversation_id = extra_context.get("conversation_id")
 
@@ -149,7 +184,7 @@ async def evaluate_agent(
     if conversation_id and response.message:
         try:
             uuid_ = UUID(conversation_id)
-            await append_message(uuid_, "assistant", response.message)
+            await append_to_history(uuid_, "assistant", response.message)
         except Exception as e:
             print(f"⚠️ Failed to append assistant message from /evaluate: {e}")
     await reporter.done()
@@ -161,8 +196,9 @@ async def agent_message(
     agent_name: str,
     request: Request,
     user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
-    reporter = TaskReporter(agent_name, auto_progress=True)
+    reporter = ScopedTaskReporter(agent_name, user_id=user.id, task_id=task_id, auto_progress=True)
 
     payload = await request.json()
     message = payload.get("message", "")
@@ -184,8 +220,9 @@ async def submit_flags(
     agent_name: str,
     request: Request,
     user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
-    reporter = TaskReporter(agent_name, total_steps=1, auto_progress=True)
+    reporter = ScopedTaskReporter(agent_name, user_id=user.id, task_id=task_id, total_steps=1, auto_progress=True)
     await reporter.step("🏁 Handling flags")
 
     try:
@@ -205,7 +242,7 @@ async def submit_flags(
     if conversation_id and msg:
         try:
             uuid_ = UUID(conversation_id)
-            await append_message(uuid_, "assistant", msg)
+            await append_to_history(uuid_, "assistant", msg)
         except Exception as e:
             print(f"⚠️ Failed to append assistant message from /flags: {e}")
 
@@ -10,45 +10,60 @@ from pytune_auth_common.services.auth_checks import get_current_user
 from app.models.policy_model import AgentResponse
 from app.services.piano_identify_from_images_service import identify_piano_from_images  # à adapter selon ton projet
 from pytune_data.crud import get_user_by_id
-from pytune_data.minio_client import PIANO_SESSION_IMAGES_BUCKET, minio_client, TEMP_BUCKET_NAME
+from pytune_data.minio_client import PIANO_SESSION_IMAGES_BUCKET
 from pytune_data.models import PianoIdentificationSession, PianoModel, User, UserPianoModel
 from pytune_data.piano_model_data_service import resolve_kind_id, resolve_piano_type_id
 from pytune_data.schemas import SaveUserPianoModelOut, UserPianoModelCreate
-from pytune_helpers_images.images import compress_image, compress_image_and_extract_metadata, download_images_locally, safe_json
-from io import BytesIO
-from uuid import UUID, uuid4
+from pytune_helpers_images.images import download_images_locally, safe_json
+from uuid import UUID
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from pytune_data.minio_client import minio_client, TEMP_BUCKET_NAME
-from io import BytesIO
 from app.core.prompt_builder import render_prompt_template
 from app.models.piano_guess_model import PianoGuessInput
 from fastapi import UploadFile, File, HTTPException
 from app.services.piano_guess_model import guess_model_from_images as guess_model_service
 from app.services.piano_report import generate_clean_piano_summary_pdf
 from app.utils.upload_images import upload_images_to_miniofiles
+from app.services.image_compression import CompressionBusyError
+from app.services.image_upload import upload_images
 from pytune_data.piano_identification_session import create_identification_session, get_identification_session, update_identification_session
-from app.services.image_labelling import label_images_from_session
+from app.services.image_labelling import build_image_data, label_images, label_new_images
+from app.utils.dag import Stage, StageError, run_dag
 from app.utils.context_helpers import build_context_snapshot, build_model_data
 from app.services.email_sender import send_piano_summary_email
 from pytune_helpers_core.pdf import upload_pdf_and_get_url
 from app.services.music_enrichment import trigger_music_source_enrichment
+from app.core.user_context_cache import invalidate_user_context
 from simple_logger.logger import get_logger, SimpleLogger
 import os
 from fastapi import Body
-from pytune_llm.task_reporting.reporter import TaskReporter
+from app.services.task_reporter import ScopedTaskReporter, get_task_id
 logger: SimpleLogger = get_logger() 
 
 router = APIRouter(tags=["Photos"])
 
+
+def _json_field(value, default):
+    """Champ JSON de session (déjà décodé ou chaîne brute)."""
+    try:
+        if isinstance(value, str) and value:
+            return json.loads(value)
+        if value:
+            return value
+    except Exception:
+        pass
+    return default
+
+
 # ✅ Nouveau endpoint FastAPI pour envoyer le rapport par email
 
 @router.post("/api/send_piano_report/{session_id}")
 async def send_piano_report(
     session_id: UUID,
     data: dict = Body(...),
-    user: UserOut = Depends(get_current_user)
+    user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
-    reporter = TaskReporter(agent="piano_agent", total_steps=5)
+    reporter = ScopedTaskReporter("piano_agent", user_id=user.id, task_id=task_id, total_steps=5)
 
     await reporter.step("📦 Fetching session")
     session = await get_identification_session(session_id)
@@ -95,6 +110,7 @@ async def send_piano_report(
         pdf_url = await upload_pdf_and_get_url(pdf_buffer)
 
         await update_identification_session(session_id=session.id, report_url=pdf_url)
+        invalidate_user_context(user.id)
 
     finally:
         for path in local_image_paths:
@@ -115,30 +131,24 @@ async def send_piano_report(
 @router.post("/pianos/guess_model")
 async def guess_model_from_images(
     data: PianoGuessInput, 
-    files: List[UploadFile] = File(...)
+    files: List[UploadFile] = File(...),
+    user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
-    reporter = TaskReporter(agent="piano_agent", total_steps=2, auto_progress=True)
+    reporter = ScopedTaskReporter("piano_agent", user_id=user.id, task_id=task_id, total_steps=2, auto_progress=True)
 
     # 📤 Step 1: Upload files to MinIO
     await reporter.step("📤 Uploading images")
-    urls = []
-    for file in files:
-        try:
-            raw = await file.read()
-            compressed = compress_image(raw)
-            fname = f"guess_model_{uuid4().hex}_{file.filename.replace(' ', '_')}"
-            minio_client.client.put_object(
-                PIANO_SESSION_IMAGES_BUCKET, fname, compressed,
-                length=compressed.getbuffer().nbytes,
-                content_type="image/jpeg"
-            )
-            url = f"https://minio.pytune.com/{PIANO_SESSION_IMAGES_BUCKET}/{fname}"
-            urls.append(url)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    try:
+        uploaded = await upload_images(files, bucket=PIANO_SESSION_IMAGES_BUCKET, prefix="guess_model")
+    except CompressionBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    urls = [u.url for u in uploaded]
 
     # 🧠 Step 2: Generate model hypothesis
     await reporter.step("🧠 Generating model hypothesis")
@@ -165,85 +175,85 @@ async def identify_photos_options(request: Request):
 async def identify_from_photos(
     manufacturer_id: Optional[int] = Query(0),
     files: list[UploadFile] = File(...),
-    user: UserOut = Depends(get_current_user)
+    refresh: bool = Query(False, description="Ignore the cached vision result"),
+    user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
-    reporter = TaskReporter("piano_agent", auto_progress=True)
+    reporter = ScopedTaskReporter("piano_agent", user_id=user.id, task_id=task_id, auto_progress=True)
 
     # 🖼️ Upload
     await reporter.step("📤 Uploading your photos")
-    photo_metadata = []
-    urls = []
-
-    for file in files:
-        try:
-            raw = await file.read()
-            compressed, safe_metadata = compress_image_and_extract_metadata(raw)
-
-            fname = f"identify_{uuid4().hex}_{file.filename.replace(' ', '_')}" # type: ignore
-            minio_client.client.put_object(
-                PIANO_SESSION_IMAGES_BUCKET, fname, compressed,
-                length=compressed.getbuffer().nbytes,
-                content_type="image/jpeg"
-            )
-
-            url = f"https://minio.pytune.com/{PIANO_SESSION_IMAGES_BUCKET}/{fname}"
-            urls.append(url)
-
-            safe_metadata["filename"] = file.filename
-            safe_metadata["minio_url"] = url
-            photo_metadata.append(safe_metadata)
-        except Exception as e:
-            logger.warning(f"Upload failed for {file.filename}: {e}")
-            raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
-
-    photo_metadata = safe_json(photo_metadata)
-
-    # 🎯 Identification principale
-    await reporter.step("🔍 Identifying piano details")
     try:
-        result = await identify_piano_from_images(
+        uploaded = await upload_images(
+            files, bucket=PIANO_SESSION_IMAGES_BUCKET, prefix="identify", with_metadata=True
+        )
+    except CompressionBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        logger.warning(f"Upload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+
+    urls = [u.url for u in uploaded]
+    photo_metadata = safe_json([u.metadata for u in uploaded])
+
+    # ⚡️ Étapes en DAG :
+    #    identify ──► guess_model
+    #    labels (ne dépend que des photos, démarre tout de suite)
+    async def identify():
+        await reporter.step("🔍 Identifying piano details")
+        return await identify_piano_from_images(
             manufacturer_id, 
             urls, 
             image_metadata=photo_metadata, 
-            reporter=reporter)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Identification failed: {e}")
+            reporter=reporter,
+            image_hashes=[u.content_hash for u in uploaded if u.content_hash],
+            use_cache=not refresh)
+
+    async def labels():
+        await reporter.step("🏷️ Labelling photos")
+        return await label_images(build_image_data(urls, photo_metadata), reporter=reporter)
+
+    async def guess_model(identify: dict):
+        await reporter.step("🔮 Guessing piano model")
+        return await guess_model_service(
+            data=build_model_data(identify),
+            image_urls=urls,
+            reporter=reporter  # 👈 passe-le pour avoir du suivi détaillé si implémenté
+        )
 
-    # 🗂️ Session
     try:
-        context_snapshot = build_context_snapshot(result, manufacturer_id)
+        stages = await run_dag([
+            Stage("identify", identify),
+            Stage("labels", labels),
+            Stage("model_hypothesis", guess_model, deps=("identify",), required=False, default={}),
+        ])
+    except StageError as e:
+        label = "Identification" if e.stage == "identify" else "Labelling"
+        raise HTTPException(status_code=500, detail=f"{label} failed: {e.error}")
+
+    result = stages["identify"]
+    raw_metadata, cleaned_labels = stages["labels"]
+    model_hypothesis = stages["model_hypothesis"] or {}
+
+    # 🗂️ Session : écrite une fois, tous les résultats fusionnés
+    try:
         session = await create_identification_session(
             user_id=user.id,
             image_urls=urls,
             photo_metadata=photo_metadata,
-            model_hypothesis=None,
-            photo_labels=None,
-            context_snapshot=context_snapshot,
+            model_hypothesis=model_hypothesis or None,
+            photo_labels=cleaned_labels,
+            context_snapshot=build_context_snapshot(result, manufacturer_id),
         )
-
-        # 🏷️ Labellisation images
-        await reporter.step("🏷️ Labelling photos")
-        raw_metadata, cleaned_labels = await label_images_from_session(session.id, reporter=reporter)
-        await update_identification_session(session.id, photo_labels=cleaned_labels, metadata=raw_metadata)
+        # create_identification_session ne prend pas `metadata`
+        await update_identification_session(session.id, metadata=raw_metadata)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Session creation failed: {e}")
-
-    # 🔮 Hypothèse modèle
-    await reporter.step("🔮 Guessing piano model")
-    try:
-        model_data = build_model_data(result)
-        model_hypothesis = await guess_model_service(
-            data=model_data,
-            image_urls=urls,
-            reporter=reporter  # 👈 passe-le pour avoir du suivi détaillé si implémenté
-        )
-        await update_identification_session(session.id, model_hypothesis=model_hypothesis)
-    except Exception as e:
-        logger.warning(f"Model hypothesis failed: {e}")
-        model_hypothesis = {}
+    finally:
+        invalidate_user_context(user.id)
 
     # 🎯 AgentResponse
     fp = {
@@ -311,6 +321,7 @@ async def upload_photos_for_piano_id(
     piano_id: int,
     files: List[UploadFile] = File(...),
     current_user: UserOut = Depends(get_current_user),
+    task_id: str = Depends(get_task_id),
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
@@ -320,36 +331,22 @@ async def upload_photos_for_piano_id(
     if not user_piano:
         raise HTTPException(status_code=404, detail="Piano not found")
 
-    reporter = TaskReporter("piano_agent", auto_progress=True)
+    reporter = ScopedTaskReporter("piano_agent", user_id=current_user.id, task_id=task_id, auto_progress=True)
 
     # 1) Upload vers MinIO
     await reporter.step("📤 Safely storing photos")
-    uploaded_urls: list[str] = []
-    uploaded_meta_list: list[dict] = []
-
-    for f in files:
-        try:
-            raw = await f.read()
-            compressed, safe_meta = compress_image_and_extract_metadata(raw)
-
-            fname = f"attach_{uuid4().hex}_{f.filename.replace(' ', '_')}"
-            minio_client.client.put_object(
-                PIANO_SESSION_IMAGES_BUCKET,
-                fname,
-                compressed,
-                length=compressed.getbuffer().nbytes,
-                content_type="image/jpeg",
-            )
-
-            url = f"https://minio.pytune.com/{PIANO_SESSION_IMAGES_BUCKET}/{fname}"
-            uploaded_urls.append(url)
-
-            safe_meta["filename"] = f.filename
-            safe_meta["minio_url"] = url
-            uploaded_meta_list.append(safe_meta)
-        except Exception as e:
-            logger.warning(f"Upload failed for {f.filename}: {e}")
-            raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    try:
+        uploaded = await upload_images(
+            files, bucket=PIANO_SESSION_IMAGES_BUCKET, prefix="attach", with_metadata=True
+        )
+    except CompressionBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        logger.warning(f"Upload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+
+    uploaded_urls: list[str] = [u.url for u in uploaded]
+    uploaded_meta_list: list[dict] = [u.metadata for u in uploaded]
 
     # 2) Session : réutiliser si possible, sinon créer
     session: Optional[PianoIdentificationSession] = None
@@ -358,6 +355,9 @@ async def upload_photos_for_piano_id(
             id=user_piano.piano_identification_session_id
         )
 
+    existing_labels: list[dict] = []
+    existing_label_meta: Optional[dict] = None
+
     if not session:
         ctx = {
             "first_piano": {
@@ -385,35 +385,38 @@ async def upload_photos_for_piano_id(
         await user_piano.save()
     else:
         # Merge URLs/métadatas avec l’existant de la session
-        try:
-            existing_urls = []
-            if isinstance(session.image_urls, list):
-                existing_urls = session.image_urls
-            elif isinstance(session.image_urls, str) and session.image_urls:
-                existing_urls = json.loads(session.image_urls)
-        except Exception:
-            existing_urls = []
-
-        try:
-            existing_meta = []
-            if isinstance(session.photo_metadata, list):
-                existing_meta = session.photo_metadata
-            elif isinstance(session.photo_metadata, str) and session.photo_metadata:
-                existing_meta = json.loads(session.photo_metadata)
-        except Exception:
-            existing_meta = []
-
-        merged_urls = list(dict.fromkeys([*existing_urls, *uploaded_urls]))
-        merged_meta = [*existing_meta, *uploaded_meta_list]
+        existing_urls = _json_field(session.image_urls, [])
+        existing_meta = _json_field(session.photo_metadata, [])
+        existing_labels = _json_field(session.photo_labels, [])
+        existing_label_meta = _json_field(getattr(session, "metadata", None), None)
+
+        # ⚠️ une photo déjà présente (même contenu → même URL) n'est ajoutée qu'une fois
+        merged_urls = list(existing_urls)
+        merged_meta = list(existing_meta)
+        known = set(existing_urls)
+        for url, meta in zip(uploaded_urls, uploaded_meta_list):
+            if url in known:
+                continue
+            known.add(url)
+            merged_urls.append(url)
+            merged_meta.append(meta)
 
         session.image_urls = safe_json(merged_urls)
         session.photo_metadata = safe_json(merged_meta)
         await session.save()
 
-    # 3) Labellisation
+    # 3) Labellisation incrémentale : seules les nouvelles photos passent par le modèle vision
     await reporter.step("🏷️ Labelling photos")
-    raw_metadata, cleaned_labels = await label_images_from_session(session.id, reporter=reporter)
-    await update_identification_session(session.id, photo_labels=cleaned_labels, metadata=raw_metadata)
+    raw_metadata, cleaned_labels = await label_new_images(
+        build_image_data(_json_field(session.image_urls, []), _json_field(session.photo_metadata, [])),
+        existing_labels,
+        existing_label_meta,
+        reporter=reporter,
+    )
+    # (relabellisation complète : même nombre de labels mais contenu recalculé)
+    if cleaned_labels != existing_labels or raw_metadata != existing_label_meta:
+        await update_identification_session(session.id, photo_labels=cleaned_labels, metadata=raw_metadata)
+    invalidate_user_context(current_user.id)
 
     await reporter.done()
 
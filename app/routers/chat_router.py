@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Body, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pytune_chat.models import Role
-from pytune_chat.store import append_message, get_conversation_history
+from app.services.conversation_history import append_to_history, get_history_window
 from app.core.policy_loader import load_policy_and_resolve
 from pytune_data.models import UserContext
 import asyncio
@@ -26,16 +26,16 @@ async def chat_handler(
         )
 
         # Sauvegarde du message utilisateur
-        await append_message(conversation_id, Role.USER, user_input)
+        await append_to_history(conversation_id, Role.USER, user_input)
 
         # Historique (si nécessaire dans prompt de l'agent)
-        history = await get_conversation_history(conversation_id)
+        history = await get_history_window(conversation_id)
 
         # Appel de l'agent
         agent_response = await load_policy_and_resolve("welcome_agent", user_context)
 
         # Sauvegarde de la réponse de l’agent
-        await append_message(conversation_id, Role.ASSISTANT, agent_response.message)
+        await append_to_history(conversation_id, Role.ASSISTANT, agent_response.message)
 
         return agent_response.model_dump()
 
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+
+from app.core.i18n.engine import missing_keys
+from app.services.llm_cache import llm_cache
+from app.services.tts_service import tts_cache
+
+router = APIRouter(prefix="/ai/metrics", tags=["Metrics"])
+
+
+@router.get("/i18n")
+async def i18n_metrics():
+    """Compteurs de clés i18n manquantes par (agent, lang, key)."""
+    counters = missing_keys.snapshot()
+    return {
+        "missing_keys": counters,
+        "missing_total": sum(c["count"] for c in counters),
+    }
+
+
+@router.get("/tts")
+async def tts_metrics():
+    """Cache audio TTS : occupation, hits / misses, évictions."""
+    return tts_cache.stats()
+
+
+@router.get("/llm")
+async def llm_cache_metrics():
+    """Cache des réponses LLM des resolvers : hits / misses depuis le démarrage."""
+    return llm_cache.stats()
@@ -1,20 +1,38 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from sse_starlette.sse import EventSourceResponse
-from pytune_llm.task_reporting.task_pubsub import get_queue
-import asyncio
+from pytune_auth_common.models.schema import UserOut
+from pytune_auth_common.services.auth_checks import get_current_user
+from app.services.task_events import (
+    TASK_EVENTS_HEARTBEAT,
+    stream_events,
+    task_topic,
+    user_topic,
+)
 
 router = APIRouter(prefix="/api")
 
 @router.get("/sse/tasks/{agent}", response_class=EventSourceResponse)
-async def stream_agent_tasks(agent: str):
-    queue = get_queue(agent)
+async def stream_agent_tasks(agent: str, user: UserOut = Depends(get_current_user)):
+    """
+    Flux historique par agent : les tâches de cet agent pour l'utilisateur connecté.
+    Préférer /sse/tasks/{agent}/{task_id} ou /sse/users/me/tasks.
+    """
+    return EventSourceResponse(stream_events(user_topic(user.id), agent=agent), ping=TASK_EVENTS_HEARTBEAT)
 
-    async def event_generator():
-        while True:
-            try:
-                msg = await queue.get()
-                yield {"event": "task", "data": msg}
-            except asyncio.CancelledError:
-                break  # proprement déconnecté
 
-    return EventSourceResponse(event_generator())
+@router.get("/sse/tasks/{agent}/{task_id}", response_class=EventSourceResponse)
+async def stream_task(agent: str, task_id: str, user: UserOut = Depends(get_current_user)):
+    """
+    Progression d'une seule tâche de l'utilisateur (id envoyé dans `X-Task-Id`).
+    Rejoue les événements déjà émis ; fermé après `done`.
+    """
+    return EventSourceResponse(
+        stream_events(task_topic(user.id, task_id), until_done=True),
+        ping=TASK_EVENTS_HEARTBEAT,
+    )
+
+
+@router.get("/sse/users/me/tasks", response_class=EventSourceResponse)
+async def stream_user_tasks(user: UserOut = Depends(get_current_user)):
+    """Toutes les tâches de l'utilisateur connecté."""
+    return EventSourceResponse(stream_events(user_topic(user.id)), ping=TASK_EVENTS_HEARTBEAT)
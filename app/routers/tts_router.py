@@ -1,45 +1,83 @@
 from fastapi import APIRouter, Depends, Request
-from pydantic import BaseModel
-from pathlib import Path
-import hashlib
-import os
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
 
 from pytune_auth_common.models.schema import UserOut
 
-from app.services.tts_service import generate_tts
+from app.services.tts_service import (
+    TTS_DIR,
+    check_lang,
+    check_voice,
+    open_tts_stream,
+    stream_sentences,
+    synthesize,
+    synthesize_sentences,
+)
 
 router = APIRouter(prefix="/tts", tags=["tts"])
 
-TTS_DIR = Path(os.getenv("TTS_AUDIO_DIR", "/tmp/pytune/tts"))
 TTS_DIR.mkdir(parents=True, exist_ok=True)
 
 class TTSRequest(BaseModel):
     text: str
     lang: str = "en"
     voice: str = "alloy"
+    # 🧩 une synthèse (et une entrée de cache) par phrase, réutilisée entre messages
+    by_sentence: bool = False
 
-@router.post("/speak")
-async def speak(req: TTSRequest, request: Request):
-    key = hashlib.sha1(
-        f"{req.text}|{req.lang}|{req.voice}".encode()
-    ).hexdigest()
-
-    filename = f"tts_{key}_{req.lang}_{req.voice}.mp3"
-    output_path = TTS_DIR / filename
-
-    if not output_path.exists():
-        generate_tts(
-            text=req.text,
-            output_path=output_path,
-            voice=req.voice,
-        )
+    @field_validator("lang")
+    @classmethod
+    def _check_lang(cls, lang: str) -> str:
+        return check_lang(lang)
 
+    @field_validator("voice")
+    @classmethod
+    def _check_voice(cls, voice: str) -> str:
+        return check_voice(voice)
+
+def _audio_base(request: Request) -> str:
     scheme = request.headers.get("x-forwarded-proto", request.url.scheme)
     host = request.headers.get("host")
+    return f"{scheme}://{host}"
 
-    base = f"{scheme}://{host}"
+@router.post("/speak")
+async def speak(req: TTSRequest, request: Request):
+    base = _audio_base(request)
+
+    if req.by_sentence:
+        parts = await synthesize_sentences(req.text, req.lang, req.voice)
+        return {
+            "playlist": [
+                {"text": sentence, "audio_url": f"{base}/tts/audio/{filename}", "cached": cached}
+                for sentence, filename, cached in parts
+            ],
+            "cached": all(cached for _, _, cached in parts),
+        }
+
+    filename, cached = await synthesize(req.text, req.lang, req.voice)
 
     return {
         "audio_url": f"{base}/tts/audio/{filename}",
-        "cached": output_path.exists(),
-    }
\ No newline at end of file
+        "cached": cached,
+    }
+
+@router.post("/speak/stream")
+async def speak_stream(req: TTSRequest):
+    """
+    Audio mp3 renvoyé au fil de la synthèse (lecture dès le premier morceau),
+    mis en cache en parallèle : les demandes suivantes sont servies depuis le disque.
+    En mode `by_sentence`, les phrases sont concaténées dans un seul flux.
+    """
+    if req.by_sentence:
+        return StreamingResponse(
+            stream_sentences(req.text, req.lang, req.voice),
+            media_type="audio/mpeg",
+            headers={"Cache-Control": "no-store"},
+        )
+
+    cached, audio = open_tts_stream(req.text, req.lang, req.voice)
+    return StreamingResponse(
+        audio,
+        media_type="audio/mpeg",
+        headers={"X-TTS-Cached": "1" if cached else "0", "Cache-Control": "no-store"},
+    )
@@ -5,6 +5,19 @@ from pytune_data.serial_number_data_service import get_serial_number_info
 from pytune_llm.llm_client import call_llm_vision, ask_llm
 import re
 
+from app.services.llm_cache import cached_llm_call, configured_llm, llm_cache_key
+
+# 🗃️ Réponses LLM mémorisées : l'année d'un numéro de série ne change pas
+AGE_LLM_CACHE_TTL = 30 * 24 * 3600
+AGE_LLM_NEGATIVE_TTL = 24 * 3600
+
+_YEAR = re.compile(r"\b(18|19|20)\d{2}\b")
+
+
+async def _ask_vision(prompt: str, image_urls: List[str], reporter: Optional[TaskReporter]) -> str:
+    vision_response = await call_llm_vision(prompt=prompt, image_urls=image_urls, reporter=reporter)
+    return vision_response["choices"][0]["message"]["content"]
+
 async def resolve_age_vision(
     manufacturer_id: int,
     serial_number: Optional[str],
@@ -20,12 +33,18 @@ async def resolve_age_vision(
     if serial_number and brand_name:
         prompt = f"What is the approximate year of manufacture for a {brand_name} piano with serial number {serial_number}?"
         try:
-            llm_answer = await ask_llm(
-                user_input=prompt, 
-                context={}, 
-                prompt_template="$user_input",
-                reporter=reporter)
-            match = re.search(r"\b(18|19|20)\d{2}\b", llm_answer)
+            llm_answer = await cached_llm_call(
+                llm_cache_key(*configured_llm(), prompt),
+                lambda: ask_llm(
+                    user_input=prompt, 
+                    context={}, 
+                    prompt_template="$user_input",
+                    reporter=reporter),
+                ttl=AGE_LLM_CACHE_TTL,
+                negative_ttl=AGE_LLM_NEGATIVE_TTL,
+                is_negative=lambda r: not _YEAR.search(r),
+            )
+            match = _YEAR.search(llm_answer)
             if match:
                 return int(match.group(0)), 85, "Estimated via LLM web lookup (text-based)."
         except Exception as e:
@@ -34,9 +53,14 @@ async def resolve_age_vision(
     if image_urls and brand_name:
         vision_prompt = f"Based on these images and the brand {brand_name}, estimate the year the piano was manufactured. Respond with a single 4-digit year."
         try:
-            vision_response = await call_llm_vision(prompt=vision_prompt, image_urls=image_urls, reporter=reporter)
-            content = vision_response["choices"][0]["message"]["content"]
-            match = re.search(r"\b(18|19|20)\d{2}\b", content)
+            content = await cached_llm_call(
+                llm_cache_key(*configured_llm(), vision_prompt, "vision", image_urls),
+                lambda: _ask_vision(vision_prompt, image_urls, reporter),
+                ttl=AGE_LLM_CACHE_TTL,
+                negative_ttl=AGE_LLM_NEGATIVE_TTL,
+                is_negative=lambda r: not _YEAR.search(r),
+            )
+            match = _YEAR.search(content)
             if match:
                 return int(match.group(0)), 70, "Estimated via LLM vision analysis."
         except Exception as e:
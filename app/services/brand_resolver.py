@@ -5,6 +5,13 @@ from pytune_llm.llm_connector import call_llm
 from pytune_llm.task_reporting.reporter import TaskReporter
 from pytune_data.piano_data_service import search_manufacturer, search_manufacturer_full
 
+from app.services.llm_cache import cached_llm_call, llm_cache_key
+
+BRAND_ENRICHMENT_LLM = "gpt-5.2"
+# 🗃️ Réponses LLM mémorisées : les marques évoluent peu
+BRAND_LLM_CACHE_TTL = 30 * 24 * 3600
+BRAND_LLM_NEGATIVE_TTL = 24 * 3600
+
 
 async def resolve_brand_name(
         brand: str, 
@@ -63,11 +70,18 @@ Example:
 """
 
     try:
-        response = await call_llm(
-            prompt=enrichment_prompt,
-            context={"source": "brand_resolver", "attempted": brand},
-            metadata={"llm_backend": "openai"},
-            reporter=reporter
+        response = await cached_llm_call(
+            llm_cache_key("openai", BRAND_ENRICHMENT_LLM, enrichment_prompt),
+            lambda: call_llm(
+                prompt=enrichment_prompt,
+                context={"source": "brand_resolver", "attempted": brand},
+                metadata={"llm_backend": "openai", "llm_model": BRAND_ENRICHMENT_LLM},
+                reporter=reporter
+            ),
+            ttl=BRAND_LLM_CACHE_TTL,
+            negative_ttl=BRAND_LLM_NEGATIVE_TTL,
+            # ❌ "Not a piano brand" : mis en cache aussi, mais moins longtemps
+            is_negative=lambda r: '"error"' in r,
         )
 
         # Extraire le JSON retourné (avec ou sans bloc ```json)
@@ -105,11 +119,15 @@ Example:
     """
 
     try:
-        corrected = await call_llm(
-            prompt=correction_prompt,
-            context={"source": "brand_resolver", "brand": brand},
-            metadata={"llm_backend": "openai"},
-            reporter=reporter
+        corrected = await cached_llm_call(
+            llm_cache_key("openai", BRAND_ENRICHMENT_LLM, correction_prompt),
+            lambda: call_llm(
+                prompt=correction_prompt,
+                context={"source": "brand_resolver", "brand": brand},
+                metadata={"llm_backend": "openai", "llm_model": BRAND_ENRICHMENT_LLM},
+                reporter=reporter
+            ),
+            ttl=BRAND_LLM_CACHE_TTL,
         )
 
         corrected = corrected.strip().splitlines()[0]
@@ -0,0 +1,124 @@
+"""
+Fenêtre glissante de l'historique des conversations actives.
+
+`get_conversation_history()` recharge toute la conversation : on la lit UNE
+fois par conversation, on n'en garde que la queue (ring buffer borné) et on
+la tient à jour à chaque `append_to_history()`. Un tour coûte alors
+O(fenêtre) au lieu de O(longueur de la conversation).
+
+Les écritures passent par le journal (write-behind) : la fenêtre reflète
+immédiatement le message, la base le reçoit en arrière-plan.
+"""
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pytune_chat.store import get_conversation_history
+
+from app.services.message_journal import message_journal
+from app.utils.single_flight import SingleFlight
+
+HISTORY_WINDOW_SIZE = int(os.getenv("HISTORY_WINDOW_SIZE", "50"))
+HISTORY_CACHE_MAX_CONVERSATIONS = int(os.getenv("HISTORY_CACHE_MAX_CONVERSATIONS", "1000"))
+# Conversation inactive au-delà de ce délai → relue depuis la base
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL_SECONDS", "900"))
+
+
+def _role(role: Any) -> str:
+    return getattr(role, "value", role)
+
+
+class ConversationHistoryCache:
+    def __init__(
+        self,
+        window: int = HISTORY_WINDOW_SIZE,
+        max_conversations: int = HISTORY_CACHE_MAX_CONVERSATIONS,
+        ttl: float = HISTORY_CACHE_TTL,
+    ):
+        self._window = window
+        self._max_conversations = max_conversations
+        self._ttl = ttl
+        # conversation → (dernier accès, ring buffer)
+        self._buffers: "OrderedDict[str, Tuple[float, Deque[dict]]]" = OrderedDict()
+        # ⚠️ un append pendant le chargement initial rend la lecture en cours obsolète
+        self._generations: Dict[str, int] = {}
+        self._flight = SingleFlight()
+
+    async def _buffer(self, conversation_id) -> Deque[dict]:
+        key = str(conversation_id)
+        entry = self._buffers.get(key)
+        now = time.monotonic()
+        if entry and now - entry[0] < self._ttl:
+            self._buffers[key] = (now, entry[1])
+            self._buffers.move_to_end(key)
+            return entry[1]
+
+        generation = self._generations.get(key, 0)
+        return await self._flight.do((key, generation), lambda: self._load(conversation_id, generation))
+
+    async def _load(self, conversation_id, generation: int) -> Deque[dict]:
+        key = str(conversation_id)
+        # ⚠️ messages encore dans le journal : on attend qu'ils soient en base
+        await message_journal.wait_flushed(conversation_id)
+        history = await get_conversation_history(conversation_id) or []
+        buffer: Deque[dict] = deque(history, maxlen=self._window)
+        if self._generations.get(key, 0) == generation:
+            self._buffers[key] = (time.monotonic(), buffer)
+            self._buffers.move_to_end(key)
+            while len(self._buffers) > self._max_conversations:
+                evicted, _ = self._buffers.popitem(last=False)
+                self._generations.pop(evicted, None)
+        return buffer
+
+    async def window(self, conversation_id, limit: Optional[int] = None) -> List[dict]:
+        """Les `limit` derniers messages (au plus la taille de la fenêtre)."""
+        buffer = await self._buffer(conversation_id)
+        messages = list(buffer)
+        if limit is not None:
+            messages = messages[-limit:] if limit > 0 else []
+        return [dict(m) for m in messages]
+
+    async def last_message(self, conversation_id, role: str) -> Optional[str]:
+        buffer = await self._buffer(conversation_id)
+        return next((m.get("content") for m in reversed(buffer) if m.get("role") == role), None)
+
+    async def append(self, conversation_id, role, content: str) -> None:
+        await message_journal.append(conversation_id, role, content)
+
+        key = str(conversation_id)
+        entry = self._buffers.get(key)
+        if entry:
+            entry[1].append({"role": _role(role), "content": content})
+        elif self._flight.in_flight((key, self._generations.get(key, 0))):
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def track_new(self, conversation_id) -> None:
+        """Conversation tout juste créée : historique vide, inutile de la relire."""
+        key = str(conversation_id)
+        self._buffers[key] = (time.monotonic(), deque(maxlen=self._window))
+        self._buffers.move_to_end(key)
+
+    def forget(self, conversation_id=None) -> None:
+        if conversation_id is None:
+            self._buffers.clear()
+            self._generations.clear()
+            return
+        key = str(conversation_id)
+        self._buffers.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+
+conversation_history = ConversationHistoryCache()
+
+
+async def get_history_window(conversation_id, limit: Optional[int] = None) -> List[dict]:
+    return await conversation_history.window(conversation_id, limit)
+
+
+async def get_last_message(conversation_id, role: str = "assistant") -> Optional[str]:
+    return await conversation_history.last_message(conversation_id, role)
+
+
+async def append_to_history(conversation_id, role, content: str) -> None:
+    await conversation_history.append(conversation_id, role, content)
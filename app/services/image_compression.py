@@ -0,0 +1,112 @@
+"""
+Compression d'images (Pillow / pillow-heif) dans un pool de processus.
+
+Le travail est CPU pur : en thread il garde le GIL, inline il bloque la
+boucle. Le pool est dimensionné sur les cœurs disponibles ; une admission
+bornée (workers × IMAGE_COMPRESSION_QUEUE_FACTOR) fait office de
+back-pressure : au-delà, on attend au plus IMAGE_COMPRESSION_QUEUE_TIMEOUT
+puis on lève `CompressionBusyError` (→ 503).
+
+Les images transitent par fichiers temporaires (chemin source → chemin
+cible) : le processus web ne charge jamais l'image entière en mémoire,
+seuls les workers le font, un fichier à la fois.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from pytune_helpers_images.images import compress_image, compress_image_and_extract_metadata
+
+
+def _default_workers() -> int:
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+IMAGE_COMPRESSION_WORKERS = int(os.getenv("IMAGE_COMPRESSION_WORKERS", str(_default_workers())))
+IMAGE_COMPRESSION_QUEUE_FACTOR = int(os.getenv("IMAGE_COMPRESSION_QUEUE_FACTOR", "4"))
+IMAGE_COMPRESSION_QUEUE_TIMEOUT = float(os.getenv("IMAGE_COMPRESSION_QUEUE_TIMEOUT_SECONDS", "5"))
+
+
+class CompressionBusyError(RuntimeError):
+    """Pool de compression saturé : la requête doit être retentée plus tard."""
+
+
+def _compress_file(src: str, dst: str, compress: bool, with_metadata: bool) -> Tuple[int, Dict[str, Any]]:
+    """
+    Exécuté dans un processus fils : lit `src`, écrit l'image compressée
+    dans `dst`, renvoie (taille écrite, métadonnées).
+    """
+    with open(src, "rb") as f:
+        raw = f.read()
+    if with_metadata:
+        buffer, metadata = compress_image_and_extract_metadata(raw)
+    else:
+        buffer, metadata = compress_image(raw), {}
+    del raw
+
+    with open(dst, "wb") as out:
+        size = out.write(buffer.getbuffer())
+    return size, metadata
+
+
+class CompressionPool:
+    def __init__(
+        self,
+        workers: int = IMAGE_COMPRESSION_WORKERS,
+        queue_factor: int = IMAGE_COMPRESSION_QUEUE_FACTOR,
+        queue_timeout: float = IMAGE_COMPRESSION_QUEUE_TIMEOUT,
+    ):
+        self._workers = workers
+        self._queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max(1, workers) * max(1, queue_factor))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            return self._executor
+
+    def _reset(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, src: str, dst: str, *, compress: bool = True, with_metadata: bool = False) -> Tuple[int, Dict[str, Any]]:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self._queue_timeout)
+        except asyncio.TimeoutError:
+            raise CompressionBusyError("Image compression pool saturated")
+
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, _compress_file, src, dst, compress, with_metadata)
+            except BrokenProcessPool:
+                # 💥 un worker est mort (OOM sur une image géante…) : nouveau pool, un seul essai
+                self._reset(executor)
+                return await loop.run_in_executor(self._get_executor(), _compress_file, src, dst, compress, with_metadata)
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+compression_pool = CompressionPool()
+
+
+async def compress_file(src: str, dst: str, *, compress: bool = True, with_metadata: bool = False) -> Tuple[int, Dict[str, Any]]:
+    return await compression_pool.run(src, dst, compress=compress, with_metadata=with_metadata)
@@ -1,5 +1,6 @@
 import asyncio
 import datetime
+import os
 from typing import Optional
 from uuid import UUID
 
@@ -10,8 +11,34 @@ from pytune_data.piano_identification_session import (
 )
 from pytune_llm.llm_vision import label_images_from_urls
 from app.services.sanitizers import sanitize_labels
+from app.services.photo_index import find_labels, remember_labels
 from datetime import datetime, timezone
 
+# 📦 Images par requête vision, et requêtes vision simultanées (tous appels confondus)
+LABELLING_BATCH_SIZE = int(os.getenv("LABELLING_BATCH_SIZE", "4"))
+LABELLING_MAX_IN_FLIGHT = int(os.getenv("LABELLING_MAX_IN_FLIGHT", "3"))
+
+_in_flight = asyncio.Semaphore(LABELLING_MAX_IN_FLIGHT)
+
+
+def build_image_data(image_urls: list[str], photo_metadata: Optional[list[dict]] = None) -> list[dict]:
+    """🧠 Prépare image_data (avec métadonnées si dispo)"""
+    if photo_metadata:
+        return [
+            {
+                "url": url,
+                "filename": meta.get("filename", f"photo_{i+1}.jpg")
+            }
+            for i, (url, meta) in enumerate(zip(image_urls, photo_metadata))
+        ]
+    return [
+        {
+            "url": url,
+            "filename": url.split("/")[-1]
+        }
+        for url in image_urls
+    ]
+
 
 async def label_images_from_session(
     session_id: UUID,
@@ -22,31 +49,31 @@ async def label_images_from_session(
     if not session or not session.image_urls:
         raise ValueError(f"No images found for session_id={session_id}")
 
+    image_data = build_image_data(session.image_urls, session.photo_metadata)
+    return await label_images(image_data, reporter=reporter)
 
-    # 🧠 Prépare image_data (avec métadonnées si dispo)
-    if session.photo_metadata:
-        image_data = [
-            {
-                "url": url,
-                "filename": meta.get("filename", f"photo_{i+1}.jpg")
-            }
-            for i, (url, meta) in enumerate(zip(session.image_urls, session.photo_metadata))
-        ]
-    else:
-        image_data = [
-            {
-                "url": url,
-                "filename": url.split("/")[-1]
-            }
-            for url in session.image_urls
-        ]
 
-    # ⚡️ Parallélise chaque appel LLM pour chaque image
-    async def label_one(img: dict) -> dict:
-        return await label_images_from_urls([img])  # ⬅️ garde bien comme liste
+async def label_images(
+    image_data: list[dict],
+    reporter: Optional[TaskReporter] = None
+) -> tuple[dict, list[dict]]:
+    """Labellise des images {url, filename} sans passer par la session."""
+    if not image_data:
+        raise ValueError("No images to label")
+
+    # ♻️ photo déjà labellisée (même contenu → même URL grâce à la dédup) : pas d'appel vision
+    known = await asyncio.gather(*(find_labels(img["url"]) for img in image_data))
+    raw_labels: list[Optional[dict]] = list(known)
+    pending = [i for i, label in enumerate(raw_labels) if label is None]
+
+    # ⚡️ Lots de LABELLING_BATCH_SIZE images par requête, lots en parallèle (bornés)
+    batches = [pending[i:i + LABELLING_BATCH_SIZE] for i in range(0, len(pending), LABELLING_BATCH_SIZE)]
+    results = await asyncio.gather(*(_label_batch([image_data[i] for i in batch]) for batch in batches))
+    for batch, labels in zip(batches, results):
+        for i, label in zip(batch, labels):
+            raw_labels[i] = label
 
-    raw_labels_nested = await asyncio.gather(*(label_one(img) for img in image_data))
-    raw_labels = [lbl[0] for lbl in raw_labels_nested]  # chaque appel retourne une liste avec un seul élément
+    await asyncio.gather(*(remember_labels(image_data[i]["url"], raw_labels[i]) for i in pending))
 
     cleaned_labels = [sanitize_labels(label) for label in raw_labels]
 
@@ -56,7 +83,91 @@ async def label_images_from_session(
         "labeling_completed": True,
         "labeling_timestamp": datetime.now(timezone.utc).isoformat(),
         "num_images": len(cleaned_labels),
-        "has_serial_number_count": sum(1 for lbl in cleaned_labels if lbl.get("has_serial_number"))
+        # ⚠️ compté sur les labels bruts : sanitize_labels ne conserve pas ce champ
+        "has_serial_number_count": sum(1 for lbl in raw_labels if lbl.get("has_serial_number"))
     }
 
     return metadata, cleaned_labels
+
+
+async def label_new_images(
+    image_data: list[dict],
+    existing_labels: list[dict],
+    existing_metadata: Optional[dict] = None,
+    reporter: Optional[TaskReporter] = None
+) -> tuple[dict, list[dict]]:
+    """
+    Labellisation incrémentale d'une session.
+
+    `image_data` : toutes les images de la session, dans l'ordre stocké ;
+    `existing_labels[i]` correspond à `image_data[i]`. Seules les images
+    au-delà des labels existants passent par le modèle vision ; les
+    compteurs de `metadata` sont cumulés.
+    """
+    if len(existing_labels) > len(image_data) or (existing_labels and not existing_metadata):
+        # 🔁 état incohérent : on repart de zéro
+        existing_labels, existing_metadata = [], None
+
+    new_images = image_data[len(existing_labels):]
+    if not new_images:
+        return dict(existing_metadata or {}), list(existing_labels)
+
+    new_metadata, new_labels = await label_images(new_images, reporter=reporter)
+    if not existing_labels:
+        return new_metadata, new_labels
+
+    metadata = {
+        **existing_metadata,
+        **new_metadata,
+        "num_images": len(existing_labels) + len(new_labels),
+        "has_serial_number_count": (
+            (existing_metadata.get("has_serial_number_count") or 0)
+            + new_metadata["has_serial_number_count"]
+        ),
+    }
+    return metadata, [*existing_labels, *new_labels]
+
+
+def _batch_request(batch: list[dict]) -> list[dict]:
+    """
+    Noms de fichiers rendus uniques dans le lot (préfixe = position) : ils
+    servent à réassocier les réponses.
+    """
+    request = []
+    for i, img in enumerate(batch):
+        name = img.get("filename") or img["url"].split("/")[-1]
+        request.append({**img, "filename": f"{i}_{name}" if len(batch) > 1 else name})
+    return request
+
+
+async def _label_batch(batch: list[dict]) -> list[dict]:
+    """
+    Une requête vision pour tout le lot ; réponses réassociées par filename,
+    par position uniquement si le modèle ne renvoie aucun nom. Une image
+    seule prend la première réponse, quel que soit son nom.
+    Sinon (noms inconnus, réponses manquantes), repli image par image.
+    """
+    request = _batch_request(batch)
+    async with _in_flight:
+        labels = await label_images_from_urls(request)
+    labels = [label for label in labels or [] if isinstance(label, dict)]
+
+    by_name = {label["filename"]: label for label in labels if label.get("filename")}
+    if by_name and all(img["filename"] in by_name for img in request):
+        ordered = [by_name[img["filename"]] for img in request]
+    elif not by_name and len(labels) == len(request):
+        ordered = labels
+    elif len(request) == 1 and labels:
+        ordered = labels[:1]
+    elif len(batch) == 1:
+        raise ValueError(f"No label returned for {request[0]['filename']}")
+    else:
+        print(f"⚠️ Batch labelling mismatch ({len(labels)}/{len(request)}), retrying per image")
+        singles = await asyncio.gather(*(_label_batch([img]) for img in batch))
+        return [labels[0] for labels in singles]
+
+    # nom d'origine restauré (le préfixe n'existe que pour la requête)
+    return [
+        {**label, "filename": img.get("filename") or label.get("filename")}
+        for img, label in zip(batch, ordered)
+    ]
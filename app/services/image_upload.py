@@ -0,0 +1,297 @@
+"""
+Upload d'images vers MinIO sans bloquer la boucle asyncio.
+
+Le client MinIO est synchrone : chaque `put_object` tourne dans un pool de
+threads dédié, borné par UPLOAD_MAX_CONCURRENCY. La compression passe par
+le pool de processus (app.services.image_compression). Les fichiers d'une
+même requête sont traités en parallèle.
+
+Mémoire bornée : l'upload est recopié par blocs dans un fichier temporaire,
+le worker écrit l'image compressée dans un second fichier, et MinIO la lit
+depuis le disque (multipart au-delà de 5 MiB). Aucun buffer image complet
+dans le processus web.
+
+Déduplication (buckets persistants seulement, UPLOAD_DEDUPE_BUCKETS) : le
+contenu brut est haché pendant la copie ; une photo déjà stockée dans le
+bucket est servie depuis l'index (app.services.photo_index) sans compression
+ni upload, après vérification que l'objet existe toujours.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence
+from uuid import uuid4
+
+from fastapi import UploadFile
+from pytune_data.minio_client import PIANO_SESSION_IMAGES_BUCKET, minio_client
+
+from app.services.image_compression import compress_file
+from app.services.photo_index import find_object, forget_object, remember_object
+from app.utils.single_flight import SingleFlight
+
+MINIO_PUBLIC_URL = os.getenv("MINIO_PUBLIC_URL", "https://minio.pytune.com").rstrip("/")
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "8"))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or tempfile.gettempdir()
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# ⚠️ jamais de dédup sur un bucket temporaire (cycle de vie / purge) : URLs mortes
+UPLOAD_DEDUPE_BUCKETS = {
+    b for b in os.getenv("UPLOAD_DEDUPE_BUCKETS", PIANO_SESSION_IMAGES_BUCKET).split(",") if b
+}
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_MAX_CONCURRENCY, thread_name_prefix="minio-upload")
+# Deux uploads simultanés du même contenu → un seul stockage
+_flight = SingleFlight()
+
+
+@dataclass
+class UploadedImage:
+    filename: Optional[str]
+    object_name: str
+    url: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    content_hash: Optional[str] = None
+    deduplicated: bool = False
+
+
+def public_url(bucket: str, object_name: str) -> str:
+    return f"{MINIO_PUBLIC_URL}/{bucket}/{object_name}"
+
+
+def object_name_for(prefix: str, filename: Optional[str]) -> str:
+    return f"{prefix}_{uuid4().hex}_{(filename or 'image').replace(' ', '_')}"
+
+
+async def run_blocking(fn: Callable, *args, **kwargs):
+    """Exécute un appel bloquant (I/O MinIO, PIL) dans le pool d'upload."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+
+async def put_object(
+    bucket: str,
+    object_name: str,
+    data: BinaryIO,
+    length: int,
+    *,
+    content_type: str = "image/jpeg",
+    client: Any = None,
+) -> str:
+    client = client if client is not None else minio_client.client
+    await run_blocking(
+        client.put_object,
+        bucket,
+        object_name,
+        data,
+        length=length,
+        content_type=content_type,
+    )
+    return public_url(bucket, object_name)
+
+
+async def put_file(
+    bucket: str,
+    object_name: str,
+    path: str,
+    *,
+    content_type: str = "image/jpeg",
+    client: Any = None,
+) -> str:
+    """Upload depuis le disque ; le client MinIO lit le fichier par parts."""
+    with open(path, "rb") as f:
+        return await put_object(
+            bucket,
+            object_name,
+            f,
+            os.fstat(f.fileno()).st_size,
+            content_type=content_type,
+            client=client,
+        )
+
+
+@contextmanager
+def temp_paths(count: int) -> Iterator[List[str]]:
+    """Chemins temporaires (dans UPLOAD_SPOOL_DIR), supprimés en sortie."""
+    paths = []
+    try:
+        for _ in range(count):
+            fd, path = tempfile.mkstemp(prefix="upload_", dir=UPLOAD_SPOOL_DIR)
+            os.close(fd)
+            paths.append(path)
+        yield paths
+    finally:
+        for path in paths:
+            _remove(path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _copy_to(src: BinaryIO, path: str) -> str:
+    digest = hashlib.sha256()
+    src.seek(0)
+    with open(path, "wb") as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+async def spool_upload(file: UploadFile, path: str) -> str:
+    """
+    Recopie l'upload par blocs vers `path` (sans `await file.read()` complet).
+    Retourne le sha256 du contenu brut.
+    """
+    return await run_blocking(_copy_to, file.file, path)
+
+
+async def _object_exists(bucket: str, object_name: str, client: Any) -> bool:
+    client = client if client is not None else minio_client.client
+    try:
+        await run_blocking(client.stat_object, bucket, object_name)
+        return True
+    except Exception:
+        return False
+
+
+async def _find_stored(
+    bucket: str, digest: str, *, compress: bool, with_metadata: bool, client: Any
+) -> Optional[Dict[str, Any]]:
+    entry = await find_object(bucket, digest, compress=compress, with_metadata=with_metadata)
+    if entry is None:
+        return None
+    # objet expiré / supprimé côté MinIO : l'entrée d'index est périmée
+    if not await _object_exists(bucket, entry["object_name"], client):
+        await forget_object(bucket, digest, compress=compress)
+        return None
+    return entry
+
+
+async def _store(
+    spooled: str,
+    digest: Optional[str],
+    *,
+    bucket: str,
+    prefix: str,
+    filename: Optional[str],
+    compress: bool,
+    with_metadata: bool,
+    content_type: str,
+    client: Any,
+) -> Dict[str, Any]:
+    """Propriétaire de `spooled` : le supprime en sortie, quoi qu'il arrive."""
+    try:
+        with temp_paths(1) as (compressed,):
+            object_name = object_name_for(prefix, filename)
+            metadata: Optional[Dict[str, Any]] = None
+            source = spooled
+            if compress or with_metadata:
+                _, metadata = await compress_file(spooled, compressed, compress=compress, with_metadata=with_metadata)
+                source = compressed
+
+            url = await put_file(bucket, object_name, source, content_type=content_type, client=client)
+    finally:
+        _remove(spooled)
+
+    entry = {"object_name": object_name, "url": url, "metadata": metadata if with_metadata else None}
+    if digest is not None:
+        await remember_object(bucket, digest, compress=compress, **entry)
+    return entry
+
+
+async def upload_image(
+    file: UploadFile,
+    *,
+    bucket: str,
+    prefix: str,
+    compress: bool = True,
+    with_metadata: bool = False,
+    content_type: Optional[str] = None,
+    client: Any = None,
+    dedupe: Optional[bool] = None,
+) -> UploadedImage:
+    if dedupe is None:
+        dedupe = bucket in UPLOAD_DEDUPE_BUCKETS
+    fd, spooled = tempfile.mkstemp(prefix="upload_", dir=UPLOAD_SPOOL_DIR)
+    os.close(fd)
+    # fichiers à supprimer ici ; vidé quand la tâche de stockage en prend possession
+    owned = [spooled]
+
+    def store() -> Awaitable[Dict[str, Any]]:
+        owned.clear()
+        return _store(
+            spooled,
+            digest if dedupe else None,
+            bucket=bucket,
+            prefix=prefix,
+            filename=file.filename,
+            compress=compress,
+            with_metadata=with_metadata,
+            content_type=content_type or "image/jpeg",
+            client=client,
+        )
+
+    try:
+        digest = await spool_upload(file, spooled)
+        entry = None
+        if dedupe:
+            entry = await _find_stored(bucket, digest, compress=compress, with_metadata=with_metadata, client=client)
+        deduplicated = entry is not None
+        if entry is None and dedupe:
+            # la tâche partagée possède ses fichiers : l'annulation du premier
+            # appelant ne les supprime pas sous les pieds des autres
+            entry = await _flight.do((bucket, digest, compress, with_metadata), store)
+        elif entry is None:
+            entry = await store()
+    finally:
+        for path in owned:
+            _remove(path)
+
+    url = entry["url"]
+    metadata: Dict[str, Any] = {}
+    if with_metadata:
+        metadata = {**(entry.get("metadata") or {}), "filename": file.filename, "minio_url": url}
+    return UploadedImage(
+        filename=file.filename,
+        object_name=entry["object_name"],
+        url=url,
+        metadata=metadata,
+        content_hash=digest,
+        deduplicated=deduplicated,
+    )
+
+
+async def upload_images(
+    files: Sequence[UploadFile],
+    *,
+    bucket: str,
+    prefix: str,
+    compress: bool = True,
+    with_metadata: bool = False,
+    content_type: Optional[str] = None,
+    client: Any = None,
+) -> List[UploadedImage]:
+    """
+    Upload parallèle ; l'ordre du résultat suit celui de `files`.
+    La première erreur est propagée telle quelle (CompressionBusyError incluse).
+    """
+    return list(await asyncio.gather(*(
+        upload_image(
+            f,
+            bucket=bucket,
+            prefix=prefix,
+            compress=compress,
+            with_metadata=with_metadata,
+            content_type=content_type,
+            client=client,
+        )
+        for f in files
+    )))
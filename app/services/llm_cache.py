@@ -0,0 +1,73 @@
+"""
+Cache des réponses LLM pour les prompts déterministes des resolvers
+(marque, modèle, année de fabrication).
+
+- clé = (backend, modèle effectivement utilisés, hash du prompt normalisé) :
+  changer de modèle invalide les réponses mémorisées
+- TTL choisi par chaque appelant ; TTL plus court pour les réponses
+  négatives (« pas une marque de piano », année introuvable…)
+- appels simultanés sur une même clé coalescés (SingleFlight) : un seul
+  aller-retour LLM quand plusieurs utilisateurs saisissent la même marque.
+  ⚠️ La progression (reporter) n'est émise que vers le premier appelant ;
+  les suivants attendent la même réponse sans étape intermédiaire.
+- les exceptions (timeout…) ne sont jamais mises en cache
+"""
+import os
+import re
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from pytune_configuration import SimpleConfig, config
+
+from app.core.result_cache import ResultCache, hash_key
+from app.utils.single_flight import SingleFlight
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_NEGATIVE_TTL = float(os.getenv("LLM_CACHE_NEGATIVE_TTL_SECONDS", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+config = config or SimpleConfig()
+
+llm_cache = ResultCache("llm_responses", ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+_flight = SingleFlight()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def configured_llm() -> Tuple[str, str]:
+    """(backend, modèle) de la configuration, appliqués par pytune_llm aux appels sans modèle explicite."""
+    return config.LLM_BACKEND, config.LLM_DEFAULT_MODEL
+
+
+def llm_cache_key(backend: str, model: Optional[str], prompt: str, *extra: Any) -> str:
+    """Prompt normalisé (espaces / indentation) : les f-strings multilignes hashent pareil."""
+    return hash_key(backend, model or "default", _WHITESPACE.sub(" ", prompt).strip(), *extra)
+
+
+async def cached_llm_call(
+    key: str,
+    call: Callable[[], Awaitable[str]],
+    *,
+    ttl: float = LLM_CACHE_TTL,
+    negative_ttl: float = LLM_CACHE_NEGATIVE_TTL,
+    is_negative: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Réponse texte de `call()`, servie depuis le cache si présente.
+    `is_negative(réponse)` → mise en cache avec `negative_ttl`.
+    """
+    if not LLM_CACHE_ENABLED:
+        return await call()
+
+    cached = await llm_cache.get(key)
+    if cached is not None:
+        return cached["response"]
+
+    async def compute() -> str:
+        response = await call()
+        if isinstance(response, str) and response.strip():
+            negative = is_negative is not None and is_negative(response)
+            await llm_cache.set(key, {"response": response}, ttl=negative_ttl if negative else ttl)
+        return response
+
+    return await _flight.do(key, compute)
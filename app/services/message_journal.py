@@ -0,0 +1,166 @@
+"""
+Journal d'écriture différée des messages de conversation (write-behind).
+
+Le chemin requête se contente d'enfiler le message ; une tâche de fond
+vide la file par lots et écrit dans `pytune_chat.store`. L'ordre est
+garanti par conversation (écriture séquentielle), les conversations d'un
+même lot sont écrites en parallèle. `stop()` vide la file avant l'arrêt ;
+les messages arrivant pendant l'arrêt sont écrits directement, après ceux
+de la même conversation encore dans la file.
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pytune_chat.store import append_message
+from simple_logger import get_logger, SimpleLogger
+
+logger: SimpleLogger = get_logger()
+
+MESSAGE_JOURNAL_BATCH_SIZE = int(os.getenv("MESSAGE_JOURNAL_BATCH_SIZE", "100"))
+MESSAGE_JOURNAL_MAX_PENDING = int(os.getenv("MESSAGE_JOURNAL_MAX_PENDING", "10000"))
+MESSAGE_JOURNAL_MAX_ATTEMPTS = int(os.getenv("MESSAGE_JOURNAL_MAX_ATTEMPTS", "3"))
+MESSAGE_JOURNAL_DRAIN_TIMEOUT = float(os.getenv("MESSAGE_JOURNAL_DRAIN_TIMEOUT_SECONDS", "10"))
+
+_STOP = object()
+
+Entry = Tuple[Any, Any, str]  # (conversation_id, role, content)
+
+
+class MessageJournal:
+    def __init__(
+        self,
+        batch_size: int = MESSAGE_JOURNAL_BATCH_SIZE,
+        max_pending: int = MESSAGE_JOURNAL_MAX_PENDING,
+        max_attempts: int = MESSAGE_JOURNAL_MAX_ATTEMPTS,
+    ):
+        self._batch_size = batch_size
+        self._max_pending = max_pending
+        self._max_attempts = max_attempts
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        # conversation → nombre de messages pas encore écrits
+        self._pending: Dict[str, int] = {}
+        self._flushed: Dict[str, asyncio.Event] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_pending)
+        self._closing = False
+        self._task = asyncio.create_task(self._run(), name="message-journal")
+
+    async def stop(self, timeout: float = MESSAGE_JOURNAL_DRAIN_TIMEOUT) -> None:
+        """Écrit tout ce qui a été enfilé avant l'appel, puis arrête la tâche."""
+        if not self.running:
+            return
+        task = self._task
+        # ⚠️ à partir d'ici, `append` écrit directement : rien n'est enfilé après _STOP
+        self._closing = True
+        if not self._queue.full():
+            self._queue.put_nowait(_STOP)
+        # (file pleine : la tâche s'arrête d'elle-même une fois la file vide)
+
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if not done:
+            lost = sum(self._pending.values())
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            logger.error(f"[journal] Drain timeout, up to {lost} message(s) not persisted")
+            # personne ne doit rester bloqué sur wait_flushed()
+            for event in self._flushed.values():
+                event.set()
+            self._pending.clear()
+            self._flushed.clear()
+        self._task = None
+
+    async def append(self, conversation_id, role, content: str) -> None:
+        # Hors lifespan (scripts, tests manuels) ou arrêt en cours : écriture directe
+        if not self.running or self._closing:
+            if self._closing:
+                # ordre de la conversation : d'abord ses messages déjà enfilés
+                await self.wait_flushed(conversation_id)
+            await append_message(conversation_id, role, content)
+            return
+
+        key = str(conversation_id)
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._flushed.setdefault(key, asyncio.Event()).clear()
+        await self._queue.put((conversation_id, role, content))
+
+    def has_pending(self, conversation_id) -> bool:
+        return self._pending.get(str(conversation_id), 0) > 0
+
+    async def wait_flushed(self, conversation_id) -> None:
+        """Attend que tous les messages enfilés pour la conversation soient en base."""
+        event = self._flushed.get(str(conversation_id))
+        if event is not None and self.has_pending(conversation_id):
+            await event.wait()
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch: List[Entry] = [item]
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if self._closing and self._queue.empty():
+                break
+
+    async def _flush(self, batch: List[Entry]) -> None:
+        by_conversation: "OrderedDict[str, List[Entry]]" = OrderedDict()
+        for entry in batch:
+            by_conversation.setdefault(str(entry[0]), []).append(entry)
+
+        await asyncio.gather(
+            *(self._flush_conversation(key, entries) for key, entries in by_conversation.items())
+        )
+
+    async def _flush_conversation(self, key: str, entries: List[Entry]) -> None:
+        try:
+            for conversation_id, role, content in entries:
+                await self._write(conversation_id, role, content)
+        finally:
+            remaining = self._pending.get(key, 0) - len(entries)
+            if remaining > 0:
+                self._pending[key] = remaining
+            else:
+                self._pending.pop(key, None)
+                event = self._flushed.pop(key, None)
+                if event is not None:
+                    event.set()
+
+    async def _write(self, conversation_id, role, content: str) -> None:
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                await append_message(conversation_id, role, content)
+                return
+            except Exception as e:
+                if attempt == self._max_attempts:
+                    logger.error(f"[journal] Message lost for conversation {conversation_id}: {e}")
+                    return
+                await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+
+
+message_journal = MessageJournal()
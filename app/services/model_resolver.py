@@ -6,6 +6,7 @@ from pytune_llm.llm_connector import call_llm
 from pytune_llm.task_reporting.reporter import TaskReporter
 from unidecode import unidecode
 from app.core.prompt_builder import render_prompt_template
+from app.services.llm_cache import cached_llm_call, llm_cache_key
 
 from pytune_data.piano_data_service import (
     search_model_full,
@@ -19,6 +20,14 @@ from pytune_data.piano_model_data_service import (
 )
 
 
+MODEL_ENRICHMENT_LLM = "gpt-5.2"
+# 🗃️ Réponses LLM mémorisées (modèle inconnu : TTL court)
+MODEL_LLM_CACHE_TTL = 7 * 24 * 3600
+MODEL_LLM_NEGATIVE_TTL = 24 * 3600
+
+_FOUND_STATUS = re.compile(r'"status"\s*:\s*"found"')
+
+
 CATEGORY_MAP = {
     1: "grand",
     2: "upright",
@@ -81,17 +90,23 @@ async def resolve_model_name(
             },
         )
 
-        llm_output = await call_llm(
-            prompt=prompt,
-            context={
-                "source": "model_resolver",
-                "attempted": model_name,
-            },
-            metadata={
-                "llm_backend": "openai",
-                "llm_model": "gpt-5.2",
-            },
-            reporter=reporter,
+        llm_output = await cached_llm_call(
+            llm_cache_key("openai", MODEL_ENRICHMENT_LLM, prompt),
+            lambda: call_llm(
+                prompt=prompt,
+                context={
+                    "source": "model_resolver",
+                    "attempted": model_name,
+                },
+                metadata={
+                    "llm_backend": "openai",
+                    "llm_model": MODEL_ENRICHMENT_LLM,
+                },
+                reporter=reporter,
+            ),
+            ttl=MODEL_LLM_CACHE_TTL,
+            negative_ttl=MODEL_LLM_NEGATIVE_TTL,
+            is_negative=lambda r: not _FOUND_STATUS.search(r),
         )
 
         # ─────────────────────────────────────────
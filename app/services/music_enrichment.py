@@ -3,11 +3,11 @@ import json
 import re
 from typing import Optional
 
-from pytune_data.user_data_service import get_user_context
 from pytune_data.piano_identification_session import update_identification_session
 from pytune_llm.llm_connector import call_llm
 from pytune_llm.task_reporting.reporter import TaskReporter
 from app.core.prompt_builder import render_prompt_template
+from app.core.user_context_cache import get_cached_user_context, invalidate_user_context
 
 
 async def trigger_music_source_enrichment(
@@ -21,7 +21,7 @@ async def trigger_music_source_enrichment(
         return
 
     # 1. Get user profile (level, style, etc.)
-    user_context = await get_user_context(user_id)
+    user_context = await get_cached_user_context(user_id)
     if not user_context:
         return
 
@@ -69,4 +69,5 @@ async def trigger_music_source_enrichment(
 
     # 6. Store in DB
     await update_identification_session(session_id, music_sources=data) # type: ignore
+    invalidate_user_context(user_id)
 
@@ -0,0 +1,63 @@
+"""
+Index de déduplication des photos, par hash du contenu brut (sha256).
+
+hash → objet MinIO déjà stocké (+ métadonnées EXIF/optique) : une photo
+ré-uploadée n'est ni recompressée ni re-stockée. Les labels vision sont
+indexés par URL (identique pour un même contenu grâce à la dédup) : une
+photo déjà labellisée ne repasse pas par le modèle vision.
+"""
+import os
+from typing import Any, Dict, Optional
+
+from app.core.result_cache import ResultCache
+
+PHOTO_INDEX_TTL = float(os.getenv("PHOTO_INDEX_TTL_SECONDS", str(30 * 24 * 3600)))
+PHOTO_INDEX_MAX_ENTRIES = int(os.getenv("PHOTO_INDEX_MAX_ENTRIES", "50000"))
+
+_objects = ResultCache("photo_objects", ttl=PHOTO_INDEX_TTL, max_entries=PHOTO_INDEX_MAX_ENTRIES)
+_labels = ResultCache("photo_labels", ttl=PHOTO_INDEX_TTL, max_entries=PHOTO_INDEX_MAX_ENTRIES)
+
+
+def _object_key(bucket: str, digest: str, compress: bool) -> str:
+    return f"{bucket}:{'c' if compress else 'r'}:{digest}"
+
+
+async def find_object(bucket: str, digest: str, *, compress: bool, with_metadata: bool) -> Optional[Dict[str, Any]]:
+    """
+    Entrée {object_name, url, metadata} si ce contenu est déjà stocké
+    dans `bucket` sous la même forme (compressée ou brute).
+    """
+    entry = await _objects.get(_object_key(bucket, digest, compress))
+    if entry is None:
+        return None
+    # ⚠️ stocké sans extraction EXIF : inutilisable quand les métadonnées sont demandées
+    if with_metadata and entry.get("metadata") is None:
+        return None
+    return entry
+
+
+async def remember_object(
+    bucket: str,
+    digest: str,
+    *,
+    compress: bool,
+    object_name: str,
+    url: str,
+    metadata: Optional[Dict[str, Any]],
+) -> None:
+    await _objects.set(
+        _object_key(bucket, digest, compress),
+        {"object_name": object_name, "url": url, "metadata": metadata},
+    )
+
+
+async def forget_object(bucket: str, digest: str, *, compress: bool) -> None:
+    await _objects.delete(_object_key(bucket, digest, compress))
+
+
+async def find_labels(url: str) -> Optional[Dict[str, Any]]:
+    return await _labels.get(url)
+
+
+async def remember_labels(url: str, labels: Dict[str, Any]) -> None:
+    await _labels.set(url, labels)
@@ -1,6 +1,7 @@
 import asyncio
 from datetime import datetime
 import json
+import os
 
 from pytune_llm.task_reporting.reporter import TaskReporter
 from unidecode import unidecode
@@ -17,10 +18,68 @@ from pytune_data.user_data_service import get_user_context
 from app.services.image_metadata_utils import build_image_context_description
 from .brand_resolver_vision import resolve_manufacturer_vision
 from .age_resolver_vision import resolve_age_vision
-from app.core.prompt_builder import render_prompt_template
+from app.core.prompt_builder import prompt_template_version, render_prompt_template
+from app.core.result_cache import ResultCache, hash_key
+
+# 🗃️ Cache des identifications vision (même photos + même indice fabricant → même résultat)
+VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "1") == "1"
+VISION_CACHE_TTL = float(os.getenv("VISION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "5000"))
+
+vision_cache = ResultCache("vision_identify", ttl=VISION_CACHE_TTL, max_entries=VISION_CACHE_MAX_ENTRIES)
+
+
+def _photos(image_metadata: Optional[list[dict]]) -> list[dict]:
+    return [
+        {
+            "filename": meta.get("filename", f"photo_{i+1}.jpg"),
+            "url": meta.get("minio_url")
+        }
+        for i, meta in enumerate(image_metadata or [])
+    ]
+
+
+def vision_cache_key(manufacturer_id: Optional[int], image_keys: List[str]) -> str:
+    """Version du prompt + hashes de contenu triés (ordre d'upload indifférent) + indice fabricant."""
+    return hash_key(
+        prompt_template_version("identify_piano"),
+        sorted(image_keys),
+        manufacturer_id or 0,
+    )
 
 
 async def identify_piano_from_images(
+    manufacturer_id: Optional[int],
+    image_urls: List[str],
+    image_metadata: Optional[list[dict]] = None,
+    reporter: Optional[TaskReporter] = None,
+    image_hashes: Optional[List[str]] = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Identification vision, servie depuis le cache persistant quand le même
+    lot de photos (hash de contenu ; à défaut URLs) a déjà été identifié.
+    `use_cache=False` force un nouvel appel (le résultat remplace l'entrée).
+    """
+    key = None
+    if VISION_CACHE_ENABLED:
+        key = vision_cache_key(manufacturer_id, image_hashes or image_urls)
+        if use_cache:
+            cached = await vision_cache.get(key)
+            if cached is not None:
+                # les noms de fichiers / URLs viennent de la requête courante
+                cached.setdefault("extra", {})["photos"] = _photos(image_metadata)
+                return cached
+
+    result = await _identify_piano_from_images(manufacturer_id, image_urls, image_metadata, reporter)
+
+    # ⚠️ seules les identifications complètes sont mémorisées (pas les erreurs)
+    if key and result.get("status") == "ok":
+        await vision_cache.set(key, result)
+    return result
+
+
+async def _identify_piano_from_images(
     manufacturer_id: Optional[int],
     image_urls: List[str],
     image_metadata: Optional[list[dict]] = None,
@@ -32,13 +91,7 @@ async def identify_piano_from_images(
             if manufacturer_id and manufacturer_id != 0 else None
         )
         optical_context = build_image_context_description(image_metadata or [])
-        photos = [
-        {
-            "filename": meta.get("filename", f"photo_{i+1}.jpg"),
-            "url": meta.get("minio_url")
-        }
-        for i, meta in enumerate(image_metadata or [])
-]
+        photos = _photos(image_metadata)
         prompt = render_prompt_template("identify_piano", {
             "manufacturer_name": manufacturer_name or "",
             "optical_context": optical_context,
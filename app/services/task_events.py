@@ -0,0 +1,253 @@
+"""
+Pub/sub des événements de progression des tâches (SSE).
+
+Chaque événement est publié sur deux topics, tous deux liés à l'utilisateur :
+  - `task:{user_id}:{task_id}` → le client qui a lancé la requête
+  - `user:{user_id}`           → toutes les tâches d'un utilisateur
+L'identifiant de tâche vient du client (`X-Task-Id`) : le préfixer par
+l'utilisateur empêche de lire ou d'alimenter le flux d'un autre compte.
+
+Les derniers événements de chaque tâche sont conservés quelques minutes
+(rejeu) : un client qui s'abonne après `done` reçoit la fin et se ferme.
+
+Chaque abonné a son propre buffer borné (les plus anciens messages sont
+écartés s'il ne suit pas) : un client lent ou absent ne bloque personne et
+rien ne s'accumule sans abonné. Backend Redis (TASK_EVENTS_BACKEND=redis)
+pour diffuser entre workers uvicorn ; sinon diffusion en mémoire.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from simple_logger import get_logger, SimpleLogger
+
+logger: SimpleLogger = get_logger()
+
+TASK_EVENTS_BACKEND = os.getenv("TASK_EVENTS_BACKEND", "memory")
+TASK_EVENTS_REDIS_URL = os.getenv("TASK_EVENTS_REDIS_URL") or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+TASK_EVENTS_BUFFER_SIZE = int(os.getenv("TASK_EVENTS_BUFFER_SIZE", "100"))
+TASK_EVENTS_HEARTBEAT = float(os.getenv("TASK_EVENTS_HEARTBEAT_SECONDS", "15"))
+TASK_EVENTS_REPLAY_SIZE = int(os.getenv("TASK_EVENTS_REPLAY_SIZE", "20"))
+TASK_EVENTS_REPLAY_TTL = float(os.getenv("TASK_EVENTS_REPLAY_TTL_SECONDS", "300"))
+TASK_EVENTS_REPLAY_MAX_TASKS = int(os.getenv("TASK_EVENTS_REPLAY_MAX_TASKS", "1000"))
+
+_REDIS_PREFIX = "pytune:tasks:"
+_REDIS_REPLAY_PREFIX = "pytune:tasks:replay:"
+_TASK_PREFIX = "task:"
+
+
+def task_topic(user_id: Any, task_id: str) -> str:
+    return f"{_TASK_PREFIX}{user_id}:{task_id}"
+
+
+def user_topic(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+
+class Subscription:
+    def __init__(self, topic: str, maxlen: int):
+        self.topic = topic
+        self.dropped = 0
+        self._buffer: Deque[dict] = deque(maxlen=maxlen)
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1  # drop-oldest (deque bornée)
+        self._buffer.append(event)
+        self._ready.set()
+
+    async def events(self) -> AsyncIterator[dict]:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._buffer:
+                yield self._buffer.popleft()
+
+
+class TaskEventBroker:
+    """Diffusion locale (un processus) ; sert aussi de couche de fan-out au backend Redis."""
+
+    def __init__(self, buffer_size: int = TASK_EVENTS_BUFFER_SIZE):
+        self._buffer_size = buffer_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        # topic de tâche → (dernière mise à jour, derniers événements)
+        self._replay: "OrderedDict[str, Tuple[float, Deque[dict]]]" = OrderedDict()
+
+    async def publish(self, topics: list[str], event: dict) -> None:
+        for topic in topics:
+            self._remember(topic, event)
+            self._dispatch(topic, event)
+
+    def _remember(self, topic: str, event: dict) -> None:
+        if not topic.startswith(_TASK_PREFIX):
+            return
+        entry = self._replay.pop(topic, None)
+        events = entry[1] if entry else deque(maxlen=TASK_EVENTS_REPLAY_SIZE)
+        events.append(event)
+        self._replay[topic] = (time.monotonic(), events)
+        now = time.monotonic()
+        while self._replay:
+            oldest_topic, (updated_at, _) = next(iter(self._replay.items()))
+            if len(self._replay) <= TASK_EVENTS_REPLAY_MAX_TASKS and now - updated_at <= TASK_EVENTS_REPLAY_TTL:
+                break
+            del self._replay[oldest_topic]
+
+    async def replay(self, topic: str) -> List[dict]:
+        entry = self._replay.get(topic)
+        if entry is None or time.monotonic() - entry[0] > TASK_EVENTS_REPLAY_TTL:
+            return []
+        return list(entry[1])
+
+    def _dispatch(self, topic: str, event: dict) -> None:
+        for subscription in tuple(self._subscribers.get(topic, ())):
+            subscription.push(event)
+
+    async def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(topic, self._buffer_size)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.topic]
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+        self._replay.clear()
+
+
+class RedisTaskEventBroker(TaskEventBroker):
+    """
+    Publication via Redis pub/sub : chaque worker ne s'abonne côté Redis
+    qu'aux topics ayant au moins un client SSE local.
+    """
+
+    def __init__(self, url: str = TASK_EVENTS_REDIS_URL, buffer_size: int = TASK_EVENTS_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        import redis.asyncio as redis  # dépendance déjà présente (pyproject)
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._pubsub = self._redis.pubsub()
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, topics: list[str], event: dict) -> None:
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for topic in topics:
+                    if topic.startswith(_TASK_PREFIX):
+                        key = _REDIS_REPLAY_PREFIX + topic
+                        pipe.rpush(key, payload)
+                        pipe.ltrim(key, -TASK_EVENTS_REPLAY_SIZE, -1)
+                        pipe.expire(key, int(TASK_EVENTS_REPLAY_TTL))
+                    pipe.publish(_REDIS_PREFIX + topic, payload)
+                await pipe.execute()
+        except Exception as e:
+            # la progression est accessoire : jamais d'échec de requête pour ça
+            logger.warning(f"[task_events] Redis publish failed: {e}")
+
+    async def replay(self, topic: str) -> List[dict]:
+        try:
+            payloads = await self._redis.lrange(_REDIS_REPLAY_PREFIX + topic, 0, -1)
+        except Exception as e:
+            logger.warning(f"[task_events] Redis replay failed: {e}")
+            return []
+        return [json.loads(payload) for payload in payloads]
+
+    async def subscribe(self, topic: str) -> Subscription:
+        first = topic not in self._subscribers
+        subscription = await super().subscribe(topic)
+        if first:
+            await self._pubsub.subscribe(_REDIS_PREFIX + topic)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(), name="task-events-redis")
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        await super().unsubscribe(subscription)
+        if subscription.topic not in self._subscribers:
+            try:
+                await self._pubsub.unsubscribe(_REDIS_PREFIX + subscription.topic)
+            except Exception as e:
+                logger.warning(f"[task_events] Redis unsubscribe failed: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.5)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                topic = message["channel"][len(_REDIS_PREFIX):]
+                self._dispatch(topic, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[task_events] Redis listener error: {e}")
+                await asyncio.sleep(1.0)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await super().close()
+        await self._pubsub.aclose()
+        await self._redis.aclose()
+
+
+def _create_broker() -> TaskEventBroker:
+    if TASK_EVENTS_BACKEND == "redis":
+        return RedisTaskEventBroker()
+    return TaskEventBroker()
+
+
+task_events = _create_broker()
+
+
+def _sse(event: dict) -> dict:
+    return {"event": "task", "data": json.dumps(event, ensure_ascii=False, default=str)}
+
+
+async def stream_events(
+    topic: str,
+    *,
+    until_done: bool = False,
+    agent: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    """
+    Générateur SSE pour un topic ; se désabonne à la déconnexion du client.
+    `until_done` : flux d'une seule tâche, rejoue les événements déjà émis
+    puis s'arrête après `done`. `agent` : ne garde que les tâches de cet agent.
+    """
+    subscription = await task_events.subscribe(topic)
+    try:
+        last_seq = -1
+        if until_done:
+            # abonné avant le rejeu : rien n'est perdu entre les deux (doublons écartés par `seq`)
+            for event in await task_events.replay(topic):
+                last_seq = event.get("seq", last_seq)
+                yield _sse(event)
+                if event.get("type") == "done":
+                    return
+
+        async for event in subscription.events():
+            if agent is not None and event.get("agent") != agent:
+                continue
+            if until_done:
+                if event.get("seq", last_seq + 1) <= last_seq:
+                    continue
+                last_seq = event.get("seq", last_seq)
+            yield _sse(event)
+            if until_done and event.get("type") == "done":
+                break
+    finally:
+        await task_events.unsubscribe(subscription)
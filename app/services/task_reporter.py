@@ -0,0 +1,104 @@
+"""
+TaskReporter rattaché à un utilisateur et à une tâche.
+
+Remplace la file unique par agent de pytune_llm, que plus rien ne lit :
+`step()` / `done()` et les autres méthodes asynchrones héritées publient
+sur le pub/sub (app.services.task_events), vers le client qui a lancé la
+requête (`task:{user_id}:{task_id}`) et ses autres onglets
+(`user:{user_id}`) ; les méthodes synchrones héritées ne font plus rien.
+Sans utilisateur, rien n'est publié : aucun flux authentifié ne pourrait
+les recevoir.
+
+Le client fournit l'identifiant de tâche via l'en-tête `X-Task-Id` (UUID
+généré côté front, puis `/api/sse/tasks/{agent}/{task_id}`) ; à défaut un
+identifiant est généré. Il n'a de sens que pour l'utilisateur qui l'a fourni.
+"""
+import inspect
+import re
+import time
+from typing import Any, Optional
+from uuid import uuid4
+
+from fastapi import Header
+from pytune_llm.task_reporting.reporter import TaskReporter
+
+from app.services.task_events import task_events, task_topic, user_topic
+
+_TASK_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def get_task_id(x_task_id: Optional[str] = Header(None)) -> str:
+    """Dépendance FastAPI : identifiant de tâche fourni par le client (ou généré)."""
+    if x_task_id and _TASK_ID_PATTERN.match(x_task_id):
+        return x_task_id
+    return uuid4().hex
+
+
+class ScopedTaskReporter(TaskReporter):
+    def __init__(
+        self,
+        agent: str,
+        *,
+        user_id: Any = None,
+        task_id: Optional[str] = None,
+        total_steps: Optional[int] = None,
+        auto_progress: bool = False,
+    ):
+        super().__init__(agent, total_steps=total_steps, auto_progress=auto_progress)
+        self.agent_name = agent
+        self.user_id = user_id
+        self.task_id = task_id or uuid4().hex
+        self._total_steps = total_steps
+        self._step_index = 0
+        self._seq = 0
+
+    def _topics(self) -> list[str]:
+        if self.user_id is None:
+            return []
+        return [task_topic(self.user_id, self.task_id), user_topic(self.user_id)]
+
+    def _progress(self) -> Optional[float]:
+        if not self._total_steps:
+            return None
+        return min(1.0, self._step_index / self._total_steps)
+
+    async def _publish(self, kind: str, message: Optional[str]) -> None:
+        topics = self._topics()
+        if not topics:
+            return
+        self._seq += 1
+        await task_events.publish(topics, {
+            "seq": self._seq,
+            "type": kind,
+            "agent": self.agent_name,
+            "task_id": self.task_id,
+            "step": self._step_index,
+            "total_steps": self._total_steps,
+            "progress": 1.0 if kind == "done" else self._progress(),
+            "message": message,
+            "ts": time.time(),
+        })
+
+    async def step(self, message: str, *args, **kwargs) -> None:
+        self._step_index += 1
+        await self._publish("step", message)
+
+    async def done(self, message: Optional[str] = None, *args, **kwargs) -> None:
+        await self._publish("done", message or "✅ Done")
+
+
+def _scoped(name: str, method):
+    """Méthode héritée de TaskReporter redirigée : plus rien n'écrit dans la file par agent."""
+    if inspect.iscoroutinefunction(method):
+        async def relay(self, message: Any = None, *args, **kwargs) -> None:
+            await self._publish(name, message if isinstance(message, str) else None)
+    else:
+        def relay(self, *args, **kwargs) -> None:
+            return None
+    relay.__name__ = relay.__qualname__ = name
+    return relay
+
+
+for _name, _method in inspect.getmembers(TaskReporter, inspect.isfunction):
+    if not _name.startswith("_") and _name not in vars(ScopedTaskReporter):
+        setattr(ScopedTaskReporter, _name, _scoped(_name, _method))
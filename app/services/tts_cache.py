@@ -0,0 +1,139 @@
+"""
+Index en mémoire du cache audio TTS (TTS_AUDIO_DIR).
+
+- taille totale bornée (TTS_CACHE_MAX_BYTES) et âge max depuis le dernier
+  accès (TTS_CACHE_MAX_AGE_SECONDS) ; éviction LRU sur la date d'accès
+- un hit ne touche pas le disque (pas de stat) : l'index fait foi
+- une entrée lue il y a moins de TTS_CACHE_EVICTION_GRACE_SECONDS n'est pas
+  évincée pour la taille : l'URL tout juste renvoyée à un client reste valable
+- reconstruit au démarrage à partir du répertoire (mtime/atime)
+
+L'index est propre à chaque processus : un fichier évincé par un autre
+worker est détecté à la lecture et traité comme un miss.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+TTS_CACHE_MAX_AGE = float(os.getenv("TTS_CACHE_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+TTS_CACHE_EVICTION_GRACE = float(os.getenv("TTS_CACHE_EVICTION_GRACE_SECONDS", "300"))
+
+
+class TTSCache:
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_bytes: int = TTS_CACHE_MAX_BYTES,
+        max_age: float = TTS_CACHE_MAX_AGE,
+        eviction_grace: float = TTS_CACHE_EVICTION_GRACE,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.eviction_grace = eviction_grace
+        # filename → (taille, dernier accès), du moins au plus récemment utilisé
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- index ----------
+
+    def rebuild(self) -> int:
+        """Scanne le répertoire (bloquant) ; supprime les fichiers temporaires orphelins."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        found: List[Tuple[float, str, int]] = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".part"):
+                # génération interrompue (arrêt du conteneur)
+                Path(entry.path).unlink(missing_ok=True)
+                continue
+            if not entry.name.endswith(".mp3"):
+                continue
+            st = entry.stat()
+            found.append((max(st.st_atime, st.st_mtime), entry.name, st.st_size))
+
+        self._entries.clear()
+        self._bytes = 0
+        for accessed_at, name, size in sorted(found):
+            self._entries[name] = (size, accessed_at)
+            self._bytes += size
+        self._unlink(self._select_victims(time.time()))
+        return len(self._entries)
+
+    def lookup(self, filename: str) -> Optional[Path]:
+        entry = self._entries.get(filename)
+        now = time.time()
+        if entry is None or now - entry[1] > self.max_age:
+            if entry is not None:
+                self._drop(filename)
+                self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries[filename] = (entry[0], now)
+        self._entries.move_to_end(filename)
+        self.hits += 1
+        return self.directory / filename
+
+    def __contains__(self, filename: str) -> bool:
+        """Présence dans l'index, sans compter de hit / miss."""
+        return filename in self._entries
+
+    def discard(self, filename: str) -> None:
+        """Entrée dont le fichier a disparu (évincé par un autre worker…)."""
+        if filename in self._entries:
+            self._drop(filename)
+
+    async def add(self, filename: str, size: int) -> None:
+        if filename in self._entries:
+            self._drop(filename)
+        self._entries[filename] = (size, time.time())
+        self._bytes += size
+        victims = self._select_victims(time.time(), keep=filename)
+        if victims:
+            await asyncio.to_thread(self._unlink, victims)
+
+    def _drop(self, filename: str) -> None:
+        size, _ = self._entries.pop(filename)
+        self._bytes -= size
+
+    def _select_victims(self, now: float, keep: Optional[str] = None) -> List[str]:
+        victims = []
+        for name, (size, accessed_at) in list(self._entries.items()):
+            if name == keep:
+                continue
+            age = now - accessed_at
+            if age <= self.max_age and (self._bytes <= self.max_bytes or age < self.eviction_grace):
+                # entrées suivantes plus récentes : plus rien à évincer
+                # (au besoin, dépassement temporaire de max_bytes pendant la période de grâce)
+                break
+            self._drop(name)
+            victims.append(name)
+        self.evictions += len(victims)
+        return victims
+
+    def _unlink(self, filenames: List[str]) -> None:
+        for name in filenames:
+            (self.directory / name).unlink(missing_ok=True)
+
+    # ---------- métriques ----------
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age,
+            "eviction_grace_seconds": self.eviction_grace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,33 +1,311 @@
 # tts_service.py
-from openai import OpenAI
-from pytune_configuration import config
+"""
+Synthèse vocale OpenAI (TTS), hors boucle bloquante.
+
+- client AsyncOpenAI : la synthèse n'immobilise plus la boucle asyncio
+- requêtes concurrentes sur un même fichier coalescées (une seule génération),
+  y compris les clients en streaming qui rejoignent une génération en cours
+- écriture atomique (fichier temporaire + rename) : jamais de mp3 tronqué servi
+- nombre de synthèses simultanées borné (TTS_MAX_CONCURRENCY)
+- cache disque borné et indexé en mémoire (app.services.tts_cache)
+- mode phrase par phrase : chaque phrase est synthétisée / cachée seule, les
+  phrases récurrentes des catalogues i18n sont réutilisées d'un message à l'autre
+"""
+import asyncio
+import hashlib
+import os
+import re
+from fnmatch import fnmatch
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from openai import AsyncOpenAI
+from pytune_configuration import config
+
+from app.core.i18n.catalog import catalog_store
+from app.services.tts_cache import TTSCache
 
-client = OpenAI(api_key=config.OPEN_AI_PYTUNE_API_KEY)
+client = AsyncOpenAI(api_key=config.OPEN_AI_PYTUNE_API_KEY)
 SUPPORTED_VOICES = {
     "alloy", "echo", "fable", "onyx", "nova", "shimmer",
     "coral", "verse", "ballad", "ash", "sage", "marin", "cedar"
 }
 
+TTS_DIR = Path(os.getenv("TTS_AUDIO_DIR", "/tmp/pytune/tts"))
+TTS_MODEL = os.getenv("TTS_MODEL", "gpt-4o-mini-tts")
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+TTS_CHUNK_SIZE = 16 * 1024
+# 🎯 phrases générées d'avance pendant la lecture en mode phrase par phrase
+TTS_SENTENCE_LOOKAHEAD = int(os.getenv("TTS_SENTENCE_LOOKAHEAD", "1"))
+
+# 🔥 Préchauffage des phrases fixes des catalogues i18n au démarrage (coût API)
+TTS_PREWARM = os.getenv("TTS_PREWARM", "0") == "1"
+TTS_PREWARM_AGENTS = [a for a in os.getenv("TTS_PREWARM_AGENTS", "piano_agent").split(",") if a]
+TTS_PREWARM_KEYS = [k for k in os.getenv("TTS_PREWARM_KEYS", "start.intro,ask_*,offer_*,confirm_*,final_*").split(",") if k]
+TTS_PREWARM_VOICES = [v for v in os.getenv("TTS_PREWARM_VOICES", "alloy").split(",") if v]
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+")
+# 🔒 lang / voice entrent dans le nom du fichier : locale courte uniquement (en, fr, pt-BR…)
+_LANG_PATTERN = re.compile(r"[A-Za-z]{2,3}([-_][A-Za-z0-9]{2,8})?")
+
+_in_flight = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+tts_cache = TTSCache(TTS_DIR)
+
+
+class _LiveAudio:
+    """
+    Génération en cours : les morceaux déjà reçus sont rejoués aux clients
+    qui arrivent en retard, puis ils suivent le flux jusqu'à la fin.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._finished = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+        # clients en attente (flux ou fichier) : une pré-génération sans client peut être annulée
+        self.waiters = 0
+
+    async def feed(self, chunk: bytes) -> None:
+        async with self._changed:
+            self._chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[BaseException] = None) -> None:
+        async with self._changed:
+            self._finished = True
+            self._error = error
+            self._changed.notify_all()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        index = 0
+        self.waiters += 1
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: index < len(self._chunks) or self._finished)
+                    pending = self._chunks[index:]
+                    finished, error = self._finished, self._error
+                for chunk in pending:
+                    yield chunk
+                index += len(pending)
+                if finished and index >= len(self._chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self.waiters -= 1
+
+    async def wait(self) -> None:
+        self.waiters += 1
+        try:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._finished)
+        finally:
+            self.waiters -= 1
+        if self._error is not None:
+            raise self._error
 
 
-def generate_tts(
+_live: Dict[str, _LiveAudio] = {}
+
+
+def normalize_voice(voice: str) -> str:
+    return voice if voice in SUPPORTED_VOICES else "alloy"
+
+
+def check_lang(lang: str) -> str:
+    if not _LANG_PATTERN.fullmatch(lang):
+        raise ValueError(f"Unsupported TTS language: {lang!r}")
+    return lang
+
+
+def check_voice(voice: str) -> str:
+    if voice not in SUPPORTED_VOICES:
+        raise ValueError(f"Unsupported TTS voice: {voice!r}")
+    return voice
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+def tts_filename(text: str, lang: str, voice: str) -> str:
+    check_lang(lang)
+    check_voice(voice)
+    key = hashlib.sha1(f"{text}|{lang}|{voice}".encode()).hexdigest()
+    return f"tts_{key}_{lang}_{voice}.mp3"
+
+
+async def generate_tts(
     *,
     text: str,
     output_path: Path,
     voice: str = "alloy",
-    model: str = "gpt-4o-mini-tts",
-) -> None:
+    model: str = TTS_MODEL,
+    on_chunk: Optional[Callable[[bytes], Awaitable[None]]] = None,
+) -> int:
     """
-    Génère un fichier audio OpenAI TTS à l'emplacement demandé.
+    Génère un fichier audio OpenAI TTS à l'emplacement demandé ; retourne sa taille.
+    `on_chunk` reçoit chaque morceau au fil de la synthèse (streaming).
     """
-    if voice not in SUPPORTED_VOICES:
-        voice = "alloy"
+    voice = normalize_voice(voice)
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.{uuid4().hex}.part")
+    size = 0
+
+    try:
+        async with _in_flight:
+            async with client.audio.speech.with_streaming_response.create(
+                model=model,
+                voice=voice,
+                input=text,
+            ) as response:
+                with open(tmp_path, "wb") as out:
+                    async for chunk in response.iter_bytes(TTS_CHUNK_SIZE):
+                        size += out.write(chunk)
+                        if on_chunk is not None:
+                            await on_chunk(chunk)
+        # ✅ rename atomique : le fichier final est complet ou absent
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return size
+
+
+async def _produce(live: _LiveAudio, filename: str, text: str, voice: str) -> None:
+    try:
+        size = await generate_tts(text=text, output_path=TTS_DIR / filename, voice=voice, on_chunk=live.feed)
+        await tts_cache.add(filename, size)
+    except asyncio.CancelledError as e:
+        await live.finish(e)
+        raise
+    except Exception as e:
+        await live.finish(e)
+    else:
+        await live.finish()
+    finally:
+        _live.pop(filename, None)
+
+
+def _generation(filename: str, text: str, voice: str) -> _LiveAudio:
+    """
+    Génération en cours pour ce fichier, démarrée si besoin. Elle tourne dans
+    sa propre tâche : la déconnexion d'un client n'interrompt pas la mise en cache.
+    """
+    live = _live.get(filename)
+    if live is None:
+        live = _live[filename] = _LiveAudio()
+        live.task = asyncio.create_task(_produce(live, filename, text, voice), name=f"tts:{filename}")
+    return live
+
+
+async def synthesize(text: str, lang: str, voice: str) -> Tuple[str, bool]:
+    """
+    Retourne (nom du fichier dans TTS_DIR, déjà en cache).
+    Les appels simultanés pour un même texte partagent une seule génération.
+    """
+    filename = tts_filename(text, lang, voice)
+    if tts_cache.lookup(filename) is not None:
+        return filename, True
+
+    await _generation(filename, text, voice).wait()
+    return filename, False
+
+
+def open_tts_stream(text: str, lang: str, voice: str) -> Tuple[bool, AsyncIterator[bytes]]:
+    """
+    (déjà en cache, flux mp3) avec une seule consultation de l'index : l'appelant
+    connaît l'origine de l'audio avant d'envoyer les en-têtes.
+    """
+    filename = tts_filename(text, lang, voice)
+    cached = tts_cache.lookup(filename)
+    return cached is not None, _stream_audio(filename, cached, text, voice)
+
+
+async def stream_tts(text: str, lang: str, voice: str) -> AsyncIterator[bytes]:
+    """
+    Audio mp3 au fil de la synthèse, écrit en parallèle dans le cache disque.
+    """
+    _, audio = open_tts_stream(text, lang, voice)
+    async for chunk in audio:
+        yield chunk
+
+
+async def _stream_audio(filename: str, cached: Optional[Path], text: str, voice: str) -> AsyncIterator[bytes]:
+    if cached is not None:
+        # l'index fait foi ; un fichier disparu malgré tout est régénéré
+        try:
+            audio = await asyncio.to_thread(cached.read_bytes)
+        except FileNotFoundError:
+            tts_cache.discard(filename)
+        else:
+            yield audio
+            return
+
+    async for chunk in _generation(filename, text, voice).chunks():
+        yield chunk
+
+
+async def synthesize_sentences(text: str, lang: str, voice: str) -> List[Tuple[str, str, bool]]:
+    """
+    Synthèse phrase par phrase : [(phrase, fichier, déjà en cache)] dans l'ordre.
+    Les phrases manquantes sont générées en parallèle (borné par TTS_MAX_CONCURRENCY).
+    """
+    sentences = split_sentences(text)
+    results = await asyncio.gather(*(synthesize(sentence, lang, voice) for sentence in sentences))
+    return [(sentence, filename, cached) for sentence, (filename, cached) in zip(sentences, results)]
+
+
+async def stream_sentences(text: str, lang: str, voice: str) -> AsyncIterator[bytes]:
+    """
+    Flux mp3 concaténé phrase par phrase. Les TTS_SENTENCE_LOOKAHEAD phrases
+    suivantes sont générées pendant la lecture de la phrase courante ; à la
+    déconnexion, celles qui n'ont pas encore été atteintes et qu'aucun autre
+    client n'attend sont annulées.
+    """
+    sentences = split_sentences(text)
+    prefetched: Dict[str, _LiveAudio] = {}
+    try:
+        for index, sentence in enumerate(sentences):
+            prefetched.pop(tts_filename(sentence, lang, voice), None)
+            for upcoming in sentences[index + 1:index + 1 + TTS_SENTENCE_LOOKAHEAD]:
+                filename = tts_filename(upcoming, lang, voice)
+                if filename not in tts_cache and filename not in _live:
+                    prefetched[filename] = _generation(filename, upcoming, voice)
+
+            async for chunk in stream_tts(sentence, lang, voice):
+                yield chunk
+    finally:
+        for live in prefetched.values():
+            if live.waiters == 0 and live.task is not None and not live.task.done():
+                live.task.cancel()
+
+
+def _prewarm_sentences() -> List[Tuple[str, str]]:
+    sentences = {}
+    for agent_name in TTS_PREWARM_AGENTS:
+        for lang in catalog_store.languages(agent_name):
+            for key, text in catalog_store.get(agent_name, lang).items():
+                if not isinstance(text, str) or "{{" in text:
+                    continue
+                if any(fnmatch(key, pattern) for pattern in TTS_PREWARM_KEYS):
+                    for sentence in split_sentences(text):
+                        sentences[(sentence, lang)] = None
+    return list(sentences)
+
 
-    with client.audio.speech.with_streaming_response.create(
-        model=model,
-        voice=voice,
-        input=text,
-    ) as response:
-        response.stream_to_file(output_path)
\ No newline at end of file
+async def prewarm_catalog_sentences() -> int:
+    """Génère en tâche de fond les phrases fixes des catalogues i18n absentes du cache."""
+    generated = 0
+    for sentence, lang in await asyncio.to_thread(_prewarm_sentences):
+        for voice in TTS_PREWARM_VOICES:
+            try:
+                _, cached = await synthesize(sentence, lang, voice)
+            except Exception as e:
+                print(f"⚠️ TTS prewarm failed ({lang}/{voice}): {e}")
+                continue
+            generated += not cached
+    return generated
@@ -1,6 +1,6 @@
 from uuid import UUID
 from pytune_auth_common.models.schema import UserOut
-from pytune_chat.store import get_conversation_history
+from app.services.conversation_history import get_last_message
 
 from app.core.context_resolver import resolve_user_context
 from app.core.context_enrichment import enrich_context
@@ -23,8 +23,7 @@ async def prepare_enriched_context(
     if convo_id:
         try:
             uuid_ = UUID(convo_id)
-            history = await get_conversation_history(uuid_)
-            last_prompt = next((m["content"] for m in reversed(history) if m["role"] == "assistant"), None)
+            last_prompt = await get_last_message(uuid_, "assistant")
             if last_prompt:
                 full_extra["last_prompt"] = last_prompt
         except Exception as e:
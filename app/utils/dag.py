@@ -0,0 +1,82 @@
+"""
+Mini exécuteur de DAG asynchrone.
+
+Chaque étape déclare ses dépendances ; elle démarre dès que celles-ci sont
+terminées et reçoit leurs résultats en arguments nommés. Les étapes
+indépendantes tournent en parallèle (asyncio.TaskGroup).
+
+    results = await run_dag([
+        Stage("identify", identify),
+        Stage("labels", label),
+        Stage("guess", guess, deps=("identify",), required=False, default={}),
+    ])
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+
+
+class StageError(RuntimeError):
+    """Échec d'une étape obligatoire ; `stage` indique laquelle."""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    # Étape facultative : en cas d'erreur, `default` est utilisé et le DAG continue
+    required: bool = True
+    default: Any = None
+
+
+def _check_acyclic(stages: list) -> None:
+    remaining = {stage.name: set(stage.deps) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Cycle between stages: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+async def run_dag(stages: Iterable[Stage]) -> Dict[str, Any]:
+    stages = list(stages)
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {missing}")
+    _check_acyclic(stages)
+
+    done: Dict[str, asyncio.Event] = {stage.name: asyncio.Event() for stage in stages}
+    results: Dict[str, Any] = {}
+
+    async def run(stage: Stage) -> None:
+        for dep in stage.deps:
+            await done[dep].wait()
+        try:
+            results[stage.name] = await stage.fn(**{dep: results[dep] for dep in stage.deps})
+        except Exception as e:
+            if stage.required:
+                raise StageError(stage.name, e) from e
+            print(f"⚠️ Optional stage '{stage.name}' failed: {e}")
+            results[stage.name] = stage.default
+        done[stage.name].set()
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            for stage in stages:
+                group.create_task(run(stage), name=f"dag:{stage.name}")
+    except* StageError as eg:
+        # ⚠️ la première étape obligatoire en échec annule les autres
+        raise eg.exceptions[0]
+
+    return results
@@ -1,12 +1,12 @@
+import asyncio
 from fastapi import UploadFile, HTTPException
 from typing import List
-from uuid import uuid4
-from io import BytesIO
-from PIL import Image
 import mimetypes
 
 from pytune_data import minio_client, TEMP_BUCKET_NAME, COLLECTION_NAME
-from pytune_helpers_images import compress_image
+
+from app.services.image_compression import CompressionBusyError
+from app.services.image_upload import upload_images
 
 
 async def upload_images_to_miniofiles(
@@ -18,28 +18,22 @@ async def upload_images_to_miniofiles(
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
     
-    urls = []
-
-    for file in files:
+    async def _upload(file: UploadFile) -> str:
+        content_type = file.content_type or mimetypes.guess_type(file.filename or "")[0] or "application/octet-stream"
         try:
-            raw = await file.read()
-            buffer = compress_image(raw) if compress else BytesIO(raw)
-            fname = f"{prefix}_{uuid4().hex}_{file.filename.replace(' ', '_')}"
-
-            content_type = file.content_type or mimetypes.guess_type(fname)[0] or "application/octet-stream"
-
-            minio_client.put_object(
-                bucket,
-                fname,
-                buffer,
-                length=buffer.getbuffer().nbytes,
-                content_type=content_type
+            uploaded = await upload_images(
+                [file],
+                bucket=bucket,
+                prefix=prefix,
+                compress=compress,
+                content_type=content_type,
+                client=minio_client,
             )
-
-            url = f"https://minio.pytune.com/{bucket}/{fname}"
-            urls.append(url)
-
+        except CompressionBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Upload failed for {file.filename}: {e}")
-    
-    return urls
+        return uploaded[0].url
+
+    # 🚀 Uploads en parallèle (pool de threads borné, boucle non bloquée)
+    return list(await asyncio.gather(*(_upload(f) for f in files)))
@@ -0,0 +1,101 @@
+"""
+Benchmark mémoire : deep_dotdict(flatten_user_context) vs vue AttrView.
+
+Mesure avec tracemalloc les allocations d'un tour d'évaluation sur un
+contexte réaliste (historique de chat, pianos, marques connues), puis
+le temps moyen par tour.
+
+Usage :
+  python -m benchmarks.bench_context_view [--brands 800] [--history 60]
+"""
+import argparse
+import time
+import tracemalloc
+from collections import ChainMap
+
+from app.core.attr_view import AttrView
+
+
+# ── Ancienne implémentation (copie récursive), conservée pour comparaison ──
+class _DotDict(dict):
+    __getattr__ = dict.get
+
+
+def _deep_dotdict(obj):
+    if isinstance(obj, dict):
+        return _DotDict({k: _deep_dotdict(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return [_deep_dotdict(v) for v in obj]
+    return obj
+
+
+def _overlay(ctx: dict) -> dict:
+    return {
+        "user_profile": {"firstname": ctx.get("firstname"), "logged_in": True},
+        "user_pianos": {"count": len(ctx.get("pianos") or [])},
+        "user_input": ctx.get("user_input", ""),
+    }
+
+
+def _old(ctx: dict):
+    flat = _overlay(ctx)
+    for key, value in ctx.items():
+        flat.setdefault(key, value)
+    return _deep_dotdict(flat)
+
+
+def _new(ctx: dict):
+    return AttrView(ChainMap(_overlay(ctx), ctx))
+
+
+def _touch(view) -> None:
+    # Accès typiques des variables piano_agent
+    fp = view.first_piano
+    _ = fp and fp.brand and fp.category and not fp.model
+    _ = view.metadata.model_hypothesis and view.metadata.model_hypothesis.name
+    _ = view.metadata.photos_attached is True
+
+
+def _context(brands: int, history: int) -> dict:
+    return {
+        "firstname": "Alice",
+        "user_input": "",
+        "first_piano": {"brand": "Yamaha", "category": "upright", "model": "", "size_cm": 131},
+        "metadata": {"photos_attached": False, "model_hypothesis": {"name": "U3"}},
+        "pianos": [{"id": i, "brand": "Yamaha", "extra_data": {"notes": "x" * 40}} for i in range(3)],
+        "known_brands": [{"id": i, "company": f"Brand {i}", "aliases": [f"b{i}"]} for i in range(brands)],
+        "chat_history": [{"role": "user" if i % 2 else "assistant", "content": "lorem ipsum " * 8} for i in range(history)],
+    }
+
+
+def _measure(build, ctx: dict, turns: int) -> tuple[int, float]:
+    tracemalloc.start()
+    view = build(ctx)
+    _touch(view)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        _touch(build(ctx))
+    return peak, (time.perf_counter() - start) / turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--brands", type=int, default=800)
+    parser.add_argument("--history", type=int, default=60)
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+
+    ctx = _context(args.brands, args.history)
+    old_peak, old_time = _measure(_old, ctx, args.turns)
+    new_peak, new_time = _measure(_new, ctx, args.turns)
+
+    print(f"📊 known_brands={args.brands}, chat_history={args.history}")
+    print(f"   deep_dotdict : {old_peak / 1024:9.1f} KiB alloués, {old_time * 1e6:8.1f} µs/tour")
+    print(f"   AttrView     : {new_peak / 1024:9.1f} KiB alloués, {new_time * 1e6:8.1f} µs/tour")
+
+
+if __name__ == "__main__":
+    main()
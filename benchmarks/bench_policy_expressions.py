@@ -0,0 +1,86 @@
+"""
+Microbenchmark : eval() sur chaînes brutes vs bytecode précompilé.
+
+Rejoue les `context.variables` + conditions de la policy piano_agent
+sur un contexte réaliste, dans les deux modes.
+
+Usage :
+  python -m benchmarks.bench_policy_expressions [--turns 2000]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import yaml
+
+from app.core.policy_expressions import compile_expression
+
+POLICY_PATH = Path(__file__).resolve().parent.parent / "app" / "static" / "agents" / "templates" / "piano_agent" / "policy.yml"
+
+
+class _Dot(dict):
+    __getattr__ = dict.get
+
+
+def _context() -> dict:
+    return _Dot({
+        "raw_user_input": "",
+        "first_piano": _Dot({
+            "brand": "Yamaha", "model": "U3", "category": "upright",
+            "serial_number": "", "serial_dont_know": False,
+            "size_cm": 131, "confirmed": False,
+        }),
+        "metadata": _Dot({
+            "extracted_from_image": False,
+            "photos_attached": False,
+            "model_hypothesis": _Dot({"name": "U3"}),
+        }),
+    })
+
+
+def _run_raw(variables: dict, conditions: list, turns: int) -> float:
+    start = time.perf_counter()
+    for _ in range(turns):
+        ctx = _context()
+        for name, expression in variables.items():
+            ctx[name] = eval(str(expression), {}, ctx)
+        for condition in conditions:
+            if eval(condition, {}, ctx):
+                break
+    return time.perf_counter() - start
+
+
+def _run_compiled(variables: dict, conditions: list, turns: int) -> float:
+    compiled_vars = {name: compile_expression(expr) for name, expr in variables.items()}
+    compiled_conds = [compile_expression(c) for c in conditions]
+    start = time.perf_counter()
+    for _ in range(turns):
+        ctx = _context()
+        for name, expression in compiled_vars.items():
+            ctx[name] = expression.evaluate(ctx)
+        for condition in compiled_conds:
+            if condition.evaluate(ctx):
+                break
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    data = yaml.safe_load(POLICY_PATH.read_text(encoding="utf-8"))
+    variables = data["context"]["variables"]
+    conditions = [s.get("if") or s.get("elif") for s in data["conversation"] if s.get("if") or s.get("elif")]
+    # ⚠️ `raw_user_input` est vide : on parcourt donc la cascade de conditions
+    raw = _run_raw(variables, conditions, args.turns)
+    compiled = _run_compiled(variables, conditions, args.turns)
+
+    print(f"📊 {len(variables)} variables, {len(conditions)} conditions, {args.turns} tours")
+    print(f"   eval(str)      : {raw * 1e6 / args.turns:8.1f} µs/tour")
+    print(f"   eval(bytecode) : {compiled * 1e6 / args.turns:8.1f} µs/tour")
+    print(f"   speedup        : x{raw / compiled:.1f}")
+
+
+if __name__ == "__main__":
+    main()
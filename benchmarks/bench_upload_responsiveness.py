@@ -0,0 +1,86 @@
+"""
+Réactivité de la boucle asyncio pendant des uploads MinIO.
+
+Un faux client MinIO (put_object bloquant, latence simulée) remplace le
+serveur ; on mesure le retard d'un « ping » 10 ms pendant que N requêtes
+uploadent chacune plusieurs fichiers, en mode synchrone (ancien code) puis
+via app.services.image_upload.
+
+Usage :
+  python -m benchmarks.bench_upload_responsiveness [--requests 8] [--files 4] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import time
+from io import BytesIO
+
+from app.services.image_upload import upload_images
+
+
+class FakeMinio:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def put_object(self, bucket, name, data, length, content_type):
+        while data.read(64 * 1024):
+            pass
+        time.sleep(self.latency)  # I/O réseau bloquante
+
+
+class FakeUpload:
+    def __init__(self, filename: str, size: int = 200_000):
+        self.filename = filename
+        self.file = BytesIO(filename.encode() + b"\0" * size)  # contenu unique (pas de dédup)
+
+    async def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+
+async def _sync_request(client: FakeMinio, files):
+    for f in files:
+        raw = await f.read()
+        buffer = BytesIO(raw)
+        client.put_object("bench", f.filename, buffer, length=len(raw), content_type="image/jpeg")
+
+
+async def _async_request(client: FakeMinio, files):
+    await upload_images(files, bucket="bench", prefix="bench", compress=False, client=client)
+
+
+async def _measure(handler, client, n_requests: int, n_files: int):
+    lags = []
+    stop = asyncio.Event()
+
+    async def ping():
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - t - 0.01)
+
+    pinger = asyncio.create_task(ping())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        handler(client, [FakeUpload(f"r{r}_f{i}.jpg") for i in range(n_files)])
+        for r in range(n_requests)
+    ))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await pinger
+    return elapsed, max(lags or [0.0])
+
+
+async def main(n_requests: int, n_files: int, latency: float):
+    client = FakeMinio(latency)
+    for label, handler in (("sync put_object", _sync_request), ("image_upload", _async_request)):
+        elapsed, worst_lag = await _measure(handler, client, n_requests, n_files)
+        print(f"{label:16s} total={elapsed * 1000:8.1f} ms   worst loop lag={worst_lag * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.files, args.latency))